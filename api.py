@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP lookup API for the UMC vocabularies.
+
+Serves the same vocabulary store and search functions as the Streamlit
+portal, for machine-to-machine use (e.g. EMR integration):
+
+    GET  /health
+    GET  /lookup/{vocab}/{code}          exact code (or ?by=concept_id)
+    POST /lookup/{vocab}                 {"codes": [...], "match_on": "concept_code"}
+    GET  /search/{vocab}?q=...           &mode=contains|words|ranked|fuzzy&limit=&fold=&mapped_only=
+
+``vocab`` is one of the keys of DATA_FILES in config.py (snomed, loinc, icd).
+
+Run with:
+    uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+
+import contextlib
+import functools
+import json
+
+import numpy as np
+import pandas as pd
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from config import DATA_FILES
+from utils.batch import map_codes, mapping_summary
+from utils.search import cached_positions, fuzzy_scores, rank_scores, top_k
+from utils.store import VocabularyStore
+
+# Largest page of search results and batch a single request may ask for
+MAX_SEARCH_LIMIT = 1000
+MAX_BATCH_CODES = 100000
+
+store = VocabularyStore()
+
+
+def json_value(value):
+    """Return a cell as a plain Python value, with missing values as None."""
+    if value is None or value is pd.NA or (isinstance(value, float) and value != value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def records(frame):
+    """Convert a result frame to JSON-ready dicts, one column at a time."""
+    columns = {col: [json_value(v) for v in frame[col].tolist()] for col in frame.columns}
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def rows_at(entry, positions):
+    """Convert a few rows of a vocabulary to JSON-ready dicts without slicing its frame.
+    
+    Reading cells straight from the column arrays skips building an
+    intermediate DataFrame, which dominates the cost of a single lookup.
+    """
+    return [{col: json_value(array[row]) for col, array in entry.columns.items()} for row in positions]
+
+
+def error(status_code, message):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+def get_entry(request):
+    """Return the loaded vocabulary named in the path, or None if unknown or unavailable."""
+    # Changed vocabulary files are reloaded in the background and swapped in
+    store.check_for_updates()
+    entry = store.get(request.path_params["vocab"])
+    if entry is None or entry.frame.empty:
+        return None
+    return entry
+
+
+def flag(request, name, default=False):
+    value = request.query_params.get(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes")
+
+
+async def health(request):
+    return JSONResponse({
+        "status": "ok",
+        "loaded": store.loaded(),
+        "resident_bytes": store.resident_size(),
+        "query_cache": store.query_cache.stats()
+    })
+
+
+async def lookup(request):
+    # Single lookups take microseconds and stay on the event loop: a thread
+    # hop would cost more than the work itself
+    entry = get_entry(request)
+    if entry is None:
+        return error(404, f"Unknown or unavailable vocabulary: {request.path_params['vocab']}")
+    
+    code = request.path_params["code"]
+    if request.query_params.get("by") == "concept_id":
+        try:
+            positions = entry.index.lookup.find_id(int(code))
+        except ValueError:
+            return error(400, f"Not a concept ID: {code}")
+    else:
+        positions = entry.index.lookup.find_code(code)
+    
+    if len(positions) == 0:
+        return error(404, f"No concept with code {code}")
+    return JSONResponse({"results": rows_at(entry, positions)})
+
+
+async def lookup_batch(request):
+    entry = get_entry(request)
+    if entry is None:
+        return error(404, f"Unknown or unavailable vocabulary: {request.path_params['vocab']}")
+    
+    # Parsing and mapping a large batch takes up to a second, so they run in
+    # the threadpool rather than holding up the other requests on this worker
+    body = await request.body()
+    return await run_in_threadpool(map_batch, entry, body)
+
+
+def map_batch(entry, body):
+    try:
+        body = json.loads(body)
+        codes = body["codes"]
+        match_on = body.get("match_on", "concept_code")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return error(400, 'Expected a JSON body like {"codes": ["I10", "E11"]}')
+    
+    if not isinstance(codes, list) or match_on not in ("concept_code", "concept_id"):
+        return error(400, '"codes" must be a list and "match_on" concept_code or concept_id')
+    if len(codes) > MAX_BATCH_CODES:
+        return error(413, f"At most {MAX_BATCH_CODES:,} codes per request")
+    
+    result = map_codes(entry.frame, entry.index, codes, match_on=match_on)
+    return results_response({"summary": mapping_summary(result)}, result)
+
+
+def results_response(payload, frame, chunk_rows=1000):
+    """JSON response of ``payload`` plus the rows of ``frame`` as "results", built a chunk of rows at a time.
+    
+    Converting and encoding a large frame in one call holds the GIL long
+    enough to stall the event loop, even from the threadpool.
+    """
+    dumps = functools.partial(json.dumps, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+    chunks = [dumps(records(frame.iloc[i:i + chunk_rows]))[1:-1] for i in range(0, len(frame), chunk_rows)]
+    body = dumps(payload)[:-1] + ',"results":[' + ','.join(chunks) + ']}'
+    return Response(body.encode('utf-8'), media_type="application/json")
+
+
+def search(request):
+    # A plain function: Starlette runs it in its threadpool, so a slow search
+    # does not hold up the event loop and the other requests on this worker
+    entry = get_entry(request)
+    if entry is None:
+        return error(404, f"Unknown or unavailable vocabulary: {request.path_params['vocab']}")
+    
+    query = request.query_params.get("q", "")
+    mode = request.query_params.get("mode", "contains")
+    fold_accents = flag(request, "fold")
+    mapped_only = flag(request, "mapped_only")
+    try:
+        limit = int(request.query_params.get("limit", 50))
+    except ValueError:
+        return error(400, "limit must be an integer")
+    if limit < 1:
+        return error(400, "limit must be at least 1")
+    limit = min(limit, MAX_SEARCH_LIMIT)
+    
+    if not query.strip():
+        return error(400, "Missing search query ?q=")
+    
+    df, index = entry.frame, entry.index
+    if mode in ("ranked", "fuzzy"):
+        if mode == "ranked":
+            scores = rank_scores(df, query, index, fold_accents, mapped_only)
+        else:
+            scores = fuzzy_scores(df, query, index, mapped_only)
+        # Every row with a positive score is a match, not just the returned page
+        positions = top_k(scores, limit)
+        total = int(np.count_nonzero(scores > 0))
+        results = df.iloc[positions].assign(score=scores[positions])
+    elif mode in ("contains", "words"):
+        # Only the returned page of the matches is ever sliced out of the frame
+        positions = cached_positions(
+            df, query, index, store.query_cache, entry.config_key, entry.generation,
+            fold_accents=fold_accents, mapped_only=mapped_only, whole_words=mode == "words"
+        )
+        total = len(positions)
+        results = df.iloc[positions[:limit]]
+    else:
+        return error(400, "mode must be contains, words, ranked or fuzzy")
+    
+    return JSONResponse({"query": query, "mode": mode, "total": total, "results": records(results)})
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Load every vocabulary before serving so no request pays for a cold load
+    for config_key in DATA_FILES:
+        store.get(config_key)
+    yield
+
+
+routes = [
+    Route("/health", health),
+    Route("/lookup/{vocab}/{code:path}", lookup),
+    Route("/lookup/{vocab}", lookup_batch, methods=["POST"]),
+    Route("/search/{vocab}", search),
+]
+
+app = Starlette(routes=routes, lifespan=lifespan)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    
+    uvicorn.run("api:app", host="0.0.0.0", port=8000)
@@ -1,13 +1,24 @@
+import uuid
 import streamlit as st
 import pandas as pd
 
 # Import custom modules
-from config import PAGE_CONFIG, VOCABULARY_INFO, ROWS_PER_PAGE_OPTIONS
-from utils.data_loader import load_vocabulary_data
-from utils.search import search_dataframe, apply_filters, get_search_statistics
+from config import (
+    PAGE_CONFIG, VOCABULARY_INFO, ROWS_PER_PAGE_OPTIONS, SEARCH_MODES, APP_MODES, BATCH_PREVIEW_ROWS,
+    ALL_VOCABULARIES, ALL_VOCABULARIES_MAX_ROWS
+)
+from utils.data_loader import resolve_vocabulary
+from utils.instrumentation import stage, start_run
+from utils.store import get_vocabulary_store
+from utils.batch import map_codes, mapping_summary, parse_pasted_codes, read_code_file, guess_code_column
+from utils.search import (
+    IncrementalSearch, cached_positions, rank_dataframe, fuzzy_dataframe, search_all_vocabularies,
+    get_search_statistics, get_position_statistics, suggest_completions
+)
 from utils.ui_components import (
-    render_custom_css, render_header, render_search_box, render_sidebar_info,
-    render_metric_card, render_no_results, render_footer, configure_dataframe_display
+    render_custom_css, render_header, render_search_box, render_sidebar_info, render_suggestions,
+    render_download_button, render_pagination, render_vocabulary_status, render_timing_panel, render_metric_card,
+    render_no_results, render_footer, configure_dataframe_display
 )
 
 # Configure Streamlit page
@@ -25,23 +36,191 @@ with st.sidebar:
     
     vocab_type = st.radio(
         "Select Vocabulary:",
-        list(VOCABULARY_INFO.keys()),
-        help="Choose which medical vocabulary to search"
+        list(VOCABULARY_INFO.keys()) + [ALL_VOCABULARIES],
+        help="Choose which medical vocabulary to search, or search all of them at once"
+    )
+    
+    app_mode = st.radio(
+        "Mode:",
+        APP_MODES,
+        help="Search one query at a time, or map a whole list of codes at once"
     )
     
     render_sidebar_info()
 
-# Load data based on selection
-df = load_vocabulary_data(vocab_type)
+# Per-stage timings of this run, when instrumentation is enabled (see config.py)
+run = start_run(
+    session=st.session_state.setdefault("session_id", uuid.uuid4().hex[:12]),
+    vocabulary=resolve_vocabulary(vocab_type) or "all",
+    mode=app_mode
+)
+
+def render_timings():
+    if run is not None:
+        with timing_box.container():
+            render_timing_panel(run)
+
+# Load data based on selection from the store shared by all sessions
+store = get_vocabulary_store()
+
+# Pick up a new vocabulary release without a restart; the swap happens in the background
+store.check_for_updates()
+
+def vocabulary_statuses():
+    return {VOCABULARY_INFO[label]["name"]: store.status(label) for label in VOCABULARY_INFO}
+
+with st.sidebar:
+    status_box = st.empty()
+    timing_box = st.empty()
+
+with status_box.container():
+    render_vocabulary_status(vocabulary_statuses())
+
+all_vocabularies = vocab_type == ALL_VOCABULARIES
+
+if all_vocabularies:
+    store.prefetch()
+    with st.spinner("Loading all vocabularies..."):
+        entries = {VOCABULARY_INFO[label]["name"]: store.get(label) for label in VOCABULARY_INFO}
+    entries = {name: entry for name, entry in entries.items() if entry is not None and not entry.frame.empty}
+    entry = next(iter(entries.values()), None)
+else:
+    loading_message = "Loading vocabulary..."
+    if store.status(vocab_type) == "loading":
+        loading_message = "Vocabulary is already loading in the background, almost there..."
+    with st.spinner(loading_message):
+        entry = store.get(vocab_type)
+    
+    # Warm up the other vocabularies so switching to them is instant
+    store.prefetch()
 
-if df.empty:
+with status_box.container():
+    render_vocabulary_status(vocabulary_statuses())
+
+if entry is None or entry.frame.empty:
     st.error("❌ Could not load vocabulary data. Please check file availability.")
     st.stop()
 
+df = entry.frame
+search_index = entry.index
+
+with st.sidebar:
+    st.caption(f"💾 Vocabulary store: {store.resident_size() / 1024**2:,.1f} MB in memory")
+    cache_stats = store.query_cache.stats()
+    st.caption(
+        f"⚡ Query cache: {cache_stats['size']}/{cache_stats['maxsize']} queries, "
+        f"{cache_stats['bytes'] / 1024**2:,.1f}/{cache_stats['max_bytes'] / 1024**2:,.0f} MB, "
+        f"{cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses"
+    )
+
+if all_vocabularies and app_mode == APP_MODES[1]:
+    st.info("📑 Batch mapping works on one vocabulary at a time. Pick SNOMED CT, LOINC or ICD-10 in the sidebar.")
+    render_timings()
+    render_footer()
+    st.stop()
+
+# Batch mapping: resolve an uploaded or pasted list of codes in one join
+if app_mode == APP_MODES[1]:
+    st.markdown("### 📑 Batch Code Mapping")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        uploaded_file = st.file_uploader(
+            "Upload a CSV or Excel file of codes",
+            type=["csv", "xlsx", "xls"],
+            key=f"batch_file_{vocab_type}"
+        )
+    
+    with col2:
+        pasted_codes = st.text_area(
+            "...or paste codes (one per line, or comma-separated)",
+            height=150,
+            key=f"batch_text_{vocab_type}"
+        )
+    
+    match_on = st.radio(
+        "Match on:",
+        ["concept_code", "concept_id"],
+        format_func=lambda col: "Code" if col == "concept_code" else "Concept ID",
+        horizontal=True
+    )
+    
+    codes = None
+    if uploaded_file is not None:
+        has_header = st.checkbox(
+            "First row is a header",
+            value=True,
+            key=f"batch_header_{vocab_type}",
+            help="Untick for a plain list of codes, so the first code is not taken as a column name"
+        )
+        try:
+            codes_df = read_code_file(uploaded_file, header=has_header)
+        except Exception as e:
+            st.error(f"Error reading {uploaded_file.name}: {e}")
+            st.stop()
+        
+        if codes_df.empty:
+            st.warning(f"⚠️ {uploaded_file.name} contains no rows")
+        else:
+            columns = list(codes_df.columns)
+            code_column = st.selectbox(
+                "Column with codes:",
+                columns,
+                index=columns.index(guess_code_column(codes_df))
+            )
+            codes = codes_df[code_column]
+    elif pasted_codes.strip():
+        codes = parse_pasted_codes(pasted_codes)
+    
+    if codes is not None and len(codes) > 0:
+        result = map_codes(df, search_index, codes, match_on=match_on)
+        summary = mapping_summary(result)
+        
+        col1, col2, col3, col4 = st.columns(4)
+        
+        with col1:
+            st.markdown(render_metric_card(summary['total'], "Codes", "#667eea"), unsafe_allow_html=True)
+        
+        with col2:
+            st.markdown(render_metric_card(summary['matched'], "Found", "#4CAF50"), unsafe_allow_html=True)
+        
+        with col3:
+            st.markdown(render_metric_card(summary['missing'], "Not Found", "#FF5722"), unsafe_allow_html=True)
+        
+        with col4:
+            st.markdown(render_metric_card(f"{summary['match_rate']:.1f}%", "Match Rate", "#FF9800"), unsafe_allow_html=True)
+        
+        st.markdown("---")
+        
+        if summary['total'] > BATCH_PREVIEW_ROWS:
+            st.info(f"📊 Previewing first {BATCH_PREVIEW_ROWS:,} of {summary['total']:,} codes; the download has all of them")
+        
+        with stage("render_dataframe", rows=min(len(result), BATCH_PREVIEW_ROWS)):
+            st.dataframe(
+                result.head(BATCH_PREVIEW_ROWS),
+                width="stretch",
+                height=600,
+                column_config=configure_dataframe_display()
+            )
+        
+        vocab_name = VOCABULARY_INFO[vocab_type]["name"].lower()
+        render_download_button(
+            result,
+            f"{vocab_name}_code_mapping",
+            label="⬇️ Download Mapping",
+            help="Download every input code with its match flag and Vietnamese name",
+            key="download_mapping"
+        )
+    
+    render_timings()
+    render_footer()
+    st.stop()
+
 # Search interface
 render_search_box()
 
-col1, col2, col3 = st.columns([3, 1, 1])
+col1, col2, col3, col4 = st.columns([3, 1, 1, 1])
 
 with col1:
     search_query = st.text_input(
@@ -59,19 +238,74 @@ with col2:
     )
 
 with col3:
-    rows_to_show = st.selectbox("📄 Show", ROWS_PER_PAGE_OPTIONS, index=1)
+    fold_accents = st.checkbox(
+        "🔤 Ignore accents",
+        value=False,
+        help="Match Vietnamese names without diacritics, e.g. \"tang huyet ap\" finds \"Tăng huyết áp\""
+    )
+
+with col4:
+    rows_to_show = st.selectbox("📄 Rows per page", ROWS_PER_PAGE_OPTIONS, index=1)
+
+# Type-ahead suggestions, hidden once the query already equals a suggestion
+suggestions = suggest_completions(df, search_index, search_query) if search_query and not all_vocabularies else []
+if any(text.lower() == search_query.strip().lower() for text in suggestions):
+    suggestions = []
+render_suggestions(suggestions, f"search_{vocab_type}")
+
+search_mode = st.radio(
+    "Match mode",
+    SEARCH_MODES,
+    horizontal=True,
+    label_visibility="collapsed",
+    key="search_mode",
+    help=(
+        "Contains: every row containing the text, in file order. "
+        "Best match: most relevant rows first. Fuzzy: tolerates typos and missing accents. "
+        "Whole words: Vietnamese words are matched whole, so \"huyết áp\" finds \"tăng huyết áp\" "
+        "but \"đường\" does not find \"đái tháo đường\"."
+    )
+)
 
 # Apply search and filters
-if search_query:
-    df_filtered = search_dataframe(df, search_query)
+# Contains results are kept as row positions into df; only the visible page is sliced out
+ranked = bool(search_query) and search_mode in (SEARCH_MODES[1], SEARCH_MODES[2])
+whole_words = search_mode == SEARCH_MODES[3]
+positions = None
+if all_vocabularies:
+    # Every vocabulary is searched on its own thread
+    mode = {SEARCH_MODES[1]: "ranked", SEARCH_MODES[2]: "fuzzy", SEARCH_MODES[3]: "words"}.get(search_mode, "contains")
+    df_filtered, source_counts, stats = search_all_vocabularies(
+        entries, search_query, store.query_cache, mode=mode,
+        limit=rows_to_show if ranked else ALL_VOCABULARIES_MAX_ROWS,
+        fold_accents=fold_accents, mapped_only=show_mapped_only
+    )
+elif ranked and search_mode == SEARCH_MODES[2]:
+    df_filtered = fuzzy_dataframe(
+        df, search_query, search_index,
+        limit=rows_to_show, mapped_only=show_mapped_only
+    )
+elif ranked:
+    df_filtered = rank_dataframe(
+        df, search_query, search_index,
+        limit=rows_to_show, fold_accents=fold_accents, mapped_only=show_mapped_only
+    )
 else:
+    # Repeated queries (and page flips) come from the shared cache; a
+    # keystroke that extends the query only rescans the previous matches
+    searcher = st.session_state.setdefault("incremental_search", IncrementalSearch())
+    positions = cached_positions(
+        df, search_query, search_index, store.query_cache, entry.config_key, entry.generation,
+        fold_accents=fold_accents, mapped_only=show_mapped_only, searcher=searcher, whole_words=whole_words
+    )
     df_filtered = df
 
-if show_mapped_only:
-    df_filtered = apply_filters(df_filtered, show_mapped_only=True)
-
-# Get statistics
-stats = get_search_statistics(df, df_filtered)
+# Get statistics (search_all_vocabularies returns its own, over every match)
+if not all_vocabularies:
+    if positions is None:
+        stats = get_search_statistics(df, df_filtered)
+    else:
+        stats = get_position_statistics(df, positions)
 
 # Display statistics
 col1, col2, col3, col4 = st.columns(4)
@@ -88,28 +322,36 @@ with col3:
 with col4:
     st.markdown(render_metric_card(stats['unique_domains'], "Domains", "#9C27B0"), unsafe_allow_html=True)
 
+if all_vocabularies:
+    st.caption("Matches per vocabulary: " + " · ".join(f"**{name}** {count:,}" for name, count in source_counts.items()))
+    if not ranked and any(count > ALL_VOCABULARIES_MAX_ROWS for count in source_counts.values()):
+        st.info(f"📊 Showing up to {ALL_VOCABULARIES_MAX_ROWS:,} matches from each vocabulary; refine the query to see the rest")
+
 # Results display
-if len(df_filtered) > 0:
+if stats['total_results'] > 0:
     st.markdown("---")
     
-    # Show results with pagination
-    total_results = len(df_filtered)
-    
-    if total_results > rows_to_show:
-        st.info(f"📊 Showing first {rows_to_show:,} of {total_results:,} results")
-        df_display = df_filtered.head(rows_to_show)
-    else:
+    if ranked:
+        st.info(f"🏆 Showing the {stats['total_results']:,} best matches, most relevant first")
         df_display = df_filtered
+    else:
+        # Show results with pagination
+        df_display = render_pagination(
+            df_filtered, rows_to_show, "results",
+            positions=positions,
+            signature=(vocab_type, search_query, show_mapped_only, fold_accents, whole_words)
+        )
     
     # Display the data with better formatting
     column_config = configure_dataframe_display()
     
-    st.dataframe(
-        df_display,
-        use_container_width=True,
-        height=600,
-        column_config=column_config
-    )
+    with stage("render_dataframe", rows=len(df_display)):
+        st.dataframe(
+            df_display,
+            use_container_width=True,
+            height=600,
+            column_config=column_config
+        )
     
     # Action buttons
     st.markdown("---")
@@ -117,14 +359,22 @@ if len(df_filtered) > 0:
     col1, col2, col3 = st.columns([1, 1, 2])
     
     with col1:
-        csv_data = df_filtered.to_csv(index=False).encode('utf-8')
-        vocab_name = VOCABULARY_INFO[vocab_type]["name"].lower()
-        st.download_button(
-            "⬇️ Download Results",
-            data=csv_data,
-            file_name=f"{vocab_name}_search_results.csv",
-            mime="text/csv",
-            help="Download current search results as CSV"
+        vocab_name = "all_vocabularies" if all_vocabularies else VOCABULARY_INFO[vocab_type]["name"].lower()
+        download_label = "⬇️ Download Results"
+        download_help = "Download current search results; the file is built when you click"
+        if all_vocabularies and len(df_filtered) < stats['total_results']:
+            download_label = f"⬇️ Download {len(df_filtered):,} of {stats['total_results']:,} Results"
+            download_help = (
+                f"Holds up to {ALL_VOCABULARIES_MAX_ROWS:,} matches from each vocabulary; "
+                "the file is built when you click"
+            )
+        render_download_button(
+            df_filtered,
+            f"{vocab_name}_search_results",
+            label=download_label,
+            help=download_help,
+            key="download_results",
+            positions=positions
         )
     
     with col2:
@@ -132,11 +382,17 @@ if len(df_filtered) > 0:
             st.rerun()
     
     with col3:
-        vocab_name = VOCABULARY_INFO[vocab_type]["name"]
-        st.markdown(f"**Last updated:** Data contains {len(df):,} total {vocab_name} concepts")
+        if all_vocabularies:
+            total_concepts = sum(len(e.frame) for e in entries.values())
+            st.markdown(f"**Last updated:** Data contains {total_concepts:,} concepts across {len(entries)} vocabularies")
+        else:
+            vocab_name = VOCABULARY_INFO[vocab_type]["name"]
+            st.markdown(f"**Last updated:** Data contains {len(df):,} total {vocab_name} concepts")
 
 else:
     render_no_results()
 
+render_timings()
+
 # Footer
 render_footer()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Apply a new Athena vocabulary release to the portal's data files.
+
+Streams the release's concept.csv once, diffs each vocabulary the portal
+serves against its current file by concept_id (added, removed, deprecated,
+renamed, otherwise updated) and rewrites only the vocabularies that
+changed, rebuilding their merged cache. Running app and API processes
+notice the new files and swap them in without a restart.
+
+Usage:
+    python apply_release.py athena/concept.csv            # all vocabularies
+    python apply_release.py athena/concept.csv icd        # a single vocabulary
+    python apply_release.py athena/concept.csv --dry-run  # only report what changed
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+from config import BASE_DIR, CONCEPT_CHUNK_ROWS, DATA_FILES, REFRESH_CHECK_SECONDS
+from utils.ingest import apply_release
+
+
+def main():
+    """Diff a release against the current data files and apply the changes."""
+    parser = argparse.ArgumentParser(description="Apply an Athena release to the vocabulary data files")
+    parser.add_argument("concept_csv", type=Path, help="Tab-separated concept.csv from the new Athena download")
+    parser.add_argument("vocabularies", nargs="*",
+                        help=f"Vocabularies to update: {', '.join(DATA_FILES)} (default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Report the changes without writing anything")
+    parser.add_argument("--report", type=Path, help="Also write the changed concept IDs to this JSON file")
+    parser.add_argument("--chunk-rows", type=int, default=CONCEPT_CHUNK_ROWS,
+                        help=f"Rows read at a time (default: {CONCEPT_CHUNK_ROWS:,})")
+    args = parser.parse_args()
+    
+    unknown = [v for v in args.vocabularies if v not in DATA_FILES]
+    if unknown:
+        parser.error(f"unknown vocabularies: {', '.join(unknown)}")
+    if not args.concept_csv.is_file():
+        parser.error(f"{args.concept_csv} not found")
+    
+    def progress(rows, bytes_read, total_bytes):
+        print(f"\r  {rows:,} rows read ({bytes_read / total_bytes:.0%})", end="", file=sys.stderr, flush=True)
+    
+    print(f"🔄 Applying {args.concept_csv} to {BASE_DIR}" + (" (dry run)" if args.dry_run else ""))
+    results = apply_release(
+        args.concept_csv, args.vocabularies or None,
+        dry_run=args.dry_run, chunk_rows=args.chunk_rows, progress=progress
+    )
+    print(file=sys.stderr)
+    
+    report = {}
+    for config_key, result in results.items():
+        diff = result["diff"]
+        counts = ", ".join(f"{n:,} {kind}" for kind, n in diff.summary().items()) if diff else ""
+        print(f"  - {config_key} ({result['vocabulary_id']}): {result['status']}" + (f" [{counts}]" if counts else ""))
+        report[config_key] = {"vocabulary_id": result["vocabulary_id"], "status": result["status"]}
+        if diff:
+            report[config_key].update({
+                kind: getattr(diff, kind).tolist() for kind in ("added", "removed", "deprecated", "renamed", "updated")
+            })
+    
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Changed concept IDs written to {args.report}")
+    
+    if any(result["status"] == "updated" for result in results.values()):
+        print(f"Running servers pick up the new version within {REFRESH_CHECK_SECONDS}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark loading, merging and searching vocabularies of different sizes.
+
+Generates synthetic vocabularies in the df_grouped_*.csv schema (OMOP
+concept columns) together with their Vietnamese translation file, times
+each stage of the pipeline for a standard set of queries, and writes the
+results as JSON so runs can be compared across commits.
+
+Usage:
+    python benchmark.py                            # 10k and 100k rows, ICD-10 schema
+    python benchmark.py --sizes 10k 100k 1M 5M --schemas snomed loinc icd
+    python benchmark.py --data-dir /tmp/bench      # keep generated files for later runs
+    python benchmark.py --compare benchmark-abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# Keep converted workbooks out of the real cache directory
+os.environ.setdefault("CACHE_DIR", str(Path(tempfile.gettempdir()) / "umc-vocab-benchmark-cache"))
+
+from config import CACHE_DIR, DATA_FILES
+from utils.data_loader import compact_frame, load_csv, merge_vocabulary_data, read_workbook, reorder_columns
+from utils.search import apply_filters, get_search_statistics, search_dataframe, word_positions
+from utils.search_index import build_search_index
+
+OMOP_COLUMNS = [
+    'concept_id', 'concept_name', 'domain_id', 'vocabulary_id', 'concept_class_id',
+    'standard_concept', 'concept_code', 'valid_start_date', 'valid_end_date', 'invalid_reason'
+]
+
+SCHEMAS = {
+    "snomed": {"domain": "Condition", "vocabulary": "SNOMED", "class": "Clinical Finding"},
+    "loinc": {"domain": "Measurement", "vocabulary": "LOINC", "class": "Lab Test"},
+    "icd": {"domain": "Condition", "vocabulary": "ICD10", "class": "ICD10 code"}
+}
+
+ENGLISH_WORDS = [
+    "acute", "chronic", "hypertension", "diabetes", "mellitus", "kidney", "disease", "heart", "failure",
+    "infection", "blood", "pressure", "glucose", "serum", "plasma", "fracture", "femur", "pneumonia",
+    "asthma", "cholera", "hepatitis", "viral", "bacterial", "tuberculosis", "lung", "liver", "anemia",
+    "deficiency", "syndrome", "disorder", "primary", "secondary", "essential", "type", "unspecified",
+    "malignant", "neoplasm", "benign", "injury", "poisoning", "mass", "volume", "urine", "level"
+]
+
+VIETNAMESE_WORDS = [
+    "tăng", "huyết", "áp", "đái", "tháo", "đường", "bệnh", "thận", "mạn", "tính", "cấp", "suy", "tim",
+    "nhiễm", "trùng", "máu", "phổi", "gan", "viêm", "lao", "hen", "suyễn", "gãy", "xương", "đùi", "thiếu",
+    "hội", "chứng", "rối", "loạn", "nguyên", "phát", "thứ", "ác", "lành", "u", "chấn", "thương", "ngộ", "độc"
+]
+
+STANDARD_QUERIES = [
+    "hypertension", "chronic kidney disease", "blood", "tăng huyết áp", "suy tim", "zzzz no match"
+]
+
+SIZE_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+# Excel sheets hold at most this many rows below the header
+EXCEL_MAX_ROWS = 1_048_575
+
+
+def parse_size(text):
+    """Parse a row count such as "10k", "1M" or "250000"."""
+    suffix = text[-1].lower()
+    if suffix in SIZE_SUFFIXES:
+        return int(float(text[:-1]) * SIZE_SUFFIXES[suffix])
+    return int(text)
+
+
+def random_names(rng, words, n, min_words=2, max_words=4):
+    """Build ``n`` names of a few random words each."""
+    words = np.array(words, dtype=object)
+    lengths = rng.integers(min_words, max_words + 1, size=n)
+    names = pd.Series(words[rng.integers(0, len(words), size=n)], dtype="string[pyarrow]")
+    for position in range(1, max_words):
+        extra = pd.Series(words[rng.integers(0, len(words), size=n)], dtype="string[pyarrow]")
+        names = names.where(lengths <= position, names + " " + extra)
+    return names
+
+
+def make_codes(schema, n):
+    """Unique concept codes shaped like the vocabulary's real ones."""
+    ids = pd.Series(np.arange(n))
+    if schema == "loinc":
+        return ids.add(1000).astype(str) + "-" + (ids % 10).astype(str)
+    if schema == "icd":
+        letters = pd.Series(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))[ids % 26].reset_index(drop=True)
+        return letters + (ids // 26 % 100).astype(str).str.zfill(2) + "." + (ids // 2600).astype(str)
+    return ids.add(10_000_000).astype(str)
+
+
+def generate_vocabulary(schema, n, seed=0):
+    """Return a synthetic (main, vietnamese) pair in the source file schemas."""
+    rng = np.random.default_rng(seed)
+    info = SCHEMAS[schema]
+    config = DATA_FILES[schema]
+    codes = make_codes(schema, n)
+    
+    main_df = pd.DataFrame({
+        'concept_id': np.arange(n, dtype=np.int64) + 40_000_000,
+        'concept_name': random_names(rng, ENGLISH_WORDS, n),
+        'domain_id': info["domain"],
+        'vocabulary_id': info["vocabulary"],
+        'concept_class_id': info["class"],
+        'standard_concept': np.where(rng.random(n) < 0.8, "S", None),
+        'concept_code': codes,
+        'valid_start_date': 19700101,
+        'valid_end_date': 20991231,
+        'invalid_reason': np.where(rng.random(n) < 0.02, "D", None)
+    })[OMOP_COLUMNS]
+    
+    # About 60% of concepts are translated, a few codes twice
+    translated = np.flatnonzero(rng.random(n) < 0.6)
+    duplicated = translated[rng.random(len(translated)) < 0.01]
+    rows = np.concatenate([translated, duplicated])
+    vi_df = pd.DataFrame({
+        config["code_column"]: codes.iloc[rows].to_numpy(),
+        config["name_column"]: random_names(rng, VIETNAMESE_WORDS, len(rows)).to_numpy()
+    })
+    return main_df, vi_df
+
+
+def write_vocabulary(schema, n, data_dir, seed=0):
+    """Write a synthetic vocabulary unless it already exists; return (main path, vietnamese path)."""
+    suffix = Path(DATA_FILES[schema]["vietnamese"]).suffix
+    main_path = data_dir / f"df_grouped_{schema}_{n}_{seed}.csv"
+    vi_path = data_dir / f"{schema}_vi_{n}_{seed}{suffix}"
+    if main_path.exists() and vi_path.exists():
+        return main_path, vi_path
+    
+    print(f"  generating {schema} with {n:,} rows...", file=sys.stderr)
+    main_df, vi_df = generate_vocabulary(schema, n, seed)
+    main_df.to_csv(main_path, index=False)
+    if suffix == ".xlsx":
+        if len(vi_df) > EXCEL_MAX_ROWS:
+            print(f"  translations capped at Excel's {EXCEL_MAX_ROWS:,} rows", file=sys.stderr)
+        vi_df.head(EXCEL_MAX_ROWS).to_excel(vi_path, index=False)
+    else:
+        vi_df.to_csv(vi_path, index=False)
+    return main_path, vi_path
+
+
+def timed(func, repeat):
+    """Run ``func`` ``repeat`` times; return its last result and the min and median seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times), float(np.median(times))
+
+
+def benchmark_vocabulary(schema, n, data_dir, repeat=3, with_index=True, seed=0):
+    """Time every stage for one vocabulary size; return a list of result records."""
+    config = DATA_FILES[schema]
+    main_path, vi_path = write_vocabulary(schema, n, data_dir, seed)
+    records = []
+
+    def record(stage, func, query=None, times=repeat):
+        result, best, median = timed(func, times)
+        records.append({
+            "schema": schema,
+            "rows": n,
+            "stage": stage,
+            "query": query,
+            "seconds_min": best,
+            "seconds_median": median,
+            "result_rows": len(result) if hasattr(result, "__len__") else None
+        })
+        print(f"  {schema:6} {n:>10,}  {stage:28} {query or '':24} {best * 1000:10.1f} ms", file=sys.stderr)
+        return result
+    
+    main_df = record("load_csv", lambda: load_csv(main_path))
+    if vi_path.suffix == ".xlsx":
+        # First read converts the workbook, later ones read the converted copy
+        (CACHE_DIR / f"{vi_path.name}.parquet").unlink(missing_ok=True)
+        vi_df = record("read_workbook (convert)", lambda: read_workbook(vi_path), times=1)
+        vi_df = record("read_workbook (cached)", lambda: read_workbook(vi_path))
+    else:
+        vi_df = record("load_csv (vietnamese)", lambda: load_csv(vi_path))
+    
+    merged = record("merge_vocabulary_data", lambda: merge_vocabulary_data(main_df.copy(), vi_df.copy(), config))
+    df = record("compact_frame", lambda: compact_frame(reorder_columns(merged)))
+    index = record("build_search_index", lambda: build_search_index(df), times=1) if with_index else None
+    
+    codes = df['concept_code'].iloc[[len(df) // 2]].tolist() + [str(df['concept_id'].iat[len(df) // 3])]
+    for query in STANDARD_QUERIES + codes:
+        results = record("search_dataframe (scan)", lambda: search_dataframe(df, query), query)
+        if index is not None:
+            record("search_dataframe (indexed)", lambda: search_dataframe(df, query, index=index), query)
+            record("word_positions", lambda: word_positions(df, query, index), query)
+        filtered = record("apply_filters", lambda: apply_filters(results, show_mapped_only=True), query)
+        record("get_search_statistics", lambda: get_search_statistics(df, filtered), query)
+    
+    return records
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print each stage's time next to a baseline run's, with the ratio."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    
+    key = lambda r: (r["schema"], r["rows"], r["stage"], r["query"])
+    before = {key(r): r["seconds_min"] for r in baseline["results"]}
+    
+    print(f"\nCompared with {baseline_path} ({baseline['meta'].get('commit')}):")
+    for r in results:
+        old = before.get(key(r))
+        if old is None:
+            continue
+        ratio = r["seconds_min"] / old if old else float("inf")
+        flag = "  ⚠️ slower" if ratio > 1.2 else ""
+        print(f"  {r['schema']:6} {r['rows']:>10,}  {r['stage']:28} {r['query'] or '':24} "
+              f"{old * 1000:9.1f} -> {r['seconds_min'] * 1000:9.1f} ms  x{ratio:.2f}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark load, merge and search on synthetic vocabularies")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"],
+                        help="Vocabulary sizes, e.g. 10k 100k 1M 5M (default: 10k 100k)")
+    parser.add_argument("--schemas", nargs="+", default=["icd"],
+                        help=f"Source schemas: {', '.join(SCHEMAS)} (default: icd)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per timing; the minimum is reported")
+    parser.add_argument("--data-dir", type=Path, help="Keep generated files here and reuse them (default: temporary)")
+    parser.add_argument("--no-index", action="store_true", help="Skip building and timing the search index")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the synthetic data")
+    parser.add_argument("--output", type=Path, help="JSON output file (default: benchmark-<commit>.json)")
+    parser.add_argument("--compare", type=Path, help="Earlier JSON output to compare against")
+    args = parser.parse_args()
+    
+    unknown = [s for s in args.schemas if s not in SCHEMAS]
+    if unknown:
+        parser.error(f"unknown schemas: {', '.join(unknown)}")
+    
+    sizes = [parse_size(size) for size in args.sizes]
+    commit = git_commit()
+    
+    with tempfile.TemporaryDirectory() as scratch:
+        data_dir = args.data_dir or Path(scratch)
+        data_dir.mkdir(parents=True, exist_ok=True)
+        
+        results = []
+        for schema in args.schemas:
+            for n in sizes:
+                results += benchmark_vocabulary(
+                    schema, n, data_dir, repeat=args.repeat, with_index=not args.no_index, seed=args.seed
+                )
+    
+    output = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "seed": args.seed
+        },
+        "results": results
+    }
+    
+    output_path = args.output or Path(f"benchmark-{commit or 'local'}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2, ensure_ascii=False)
+    print(f"📊 Wrote {len(results)} timings to {output_path}")
+    
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
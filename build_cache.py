@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Build the on-disk cache of merged vocabularies.
+
+Run this after updating any file in the data directory so the first
+request to the portal reads the prebuilt frames instead of re-merging.
+"""
+
+import argparse
+
+from config import CACHE_DIR, DATA_FILES
+from utils.data_loader import build_vocabulary_cache
+
+
+def main():
+    """Build cached frames for the selected vocabularies."""
+    parser = argparse.ArgumentParser(description="Build the merged vocabulary cache")
+    parser.add_argument("vocabularies", nargs="*",
+                        help=f"Vocabularies to build: {', '.join(DATA_FILES)} (default: all)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the cache is fresh")
+    args = parser.parse_args()
+    
+    unknown = [v for v in args.vocabularies if v not in DATA_FILES]
+    if unknown:
+        parser.error(f"unknown vocabularies: {', '.join(unknown)}")
+    
+    print(f"📦 Building vocabulary cache in {CACHE_DIR}")
+    results = build_vocabulary_cache(args.vocabularies or None, force=args.force)
+    
+    for config_key, status in results.items():
+        print(f"  - {config_key}: {status}")
+
+
+if __name__ == "__main__":
+    main()
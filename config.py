@@ -4,6 +4,9 @@ import os
 # Base configuration - use environment variable or default to data directory
 BASE_DIR = Path(os.getenv('BASE_DIR', Path(__file__).parent / 'data'))
 
+# Directory for prebuilt columnar copies of the merged vocabularies
+CACHE_DIR = Path(os.getenv('CACHE_DIR', BASE_DIR / '.cache'))
+
 # Data file paths
 DATA_FILES = {
     "snomed": {
@@ -41,10 +44,96 @@ DISPLAY_COLUMNS = [
     'standard_concept', 'concept_code'
 ]
 
+# Low-cardinality columns stored as categoricals, and free-text columns stored as Arrow strings
+CATEGORICAL_COLUMNS = ['domain_id', 'vocabulary_id', 'concept_class_id', 'standard_concept', 'invalid_reason']
+TEXT_COLUMNS = ['concept_name', 'concept_name_vi', 'concept_code']
+
 SEARCH_COLUMNS = ['concept_id', 'concept_name', 'concept_name_vi', 'concept_code']
 
+# Columns matched on accent-folded text when "Ignore accents" is on
+FOLD_COLUMNS = ['concept_name', 'concept_name_vi']
+
+# Ranked ("Best match") search: BM25 over the name columns, exact code/ID hits first
+RANK_COLUMNS = ['concept_name', 'concept_name_vi']
+BM25_K1 = 1.2
+BM25_B = 0.75
+EXACT_MATCH_BOOST = 1000.0
+
+# Whole-word search: the tokenizer each name column is segmented with ("syllable" or
+# "vietnamese", see utils/tokenizer.py), and the one queries are segmented with. The
+# Vietnamese tokenizer joins the syllables of dictionary words, e.g. "tăng_huyết_áp"
+COLUMN_TOKENIZERS = {'concept_name': 'syllable', 'concept_name_vi': 'vietnamese'}
+QUERY_TOKENIZER = 'vietnamese'
+VIETNAMESE_DICTIONARY = Path(os.getenv('VIETNAMESE_DICTIONARY', Path(__file__).parent / 'utils' / 'vietnamese_words.txt'))
+
+# Fuzzy search: trigram similarity a term needs, and how many similar terms each query word may use
+FUZZY_MIN_SIMILARITY = 0.45
+FUZZY_MAX_TERMS = 20
+
+# An extended query only rescans the previous matches when there are at most this many
+# (above that, the token index narrows faster than a scan)
+NARROW_MAX_ROWS = 5000
+
+# Contains-search results shared by all sessions: number of queries kept, and seconds each stays valid
+QUERY_CACHE_SIZE = int(os.getenv('QUERY_CACHE_SIZE', 256))
+QUERY_CACHE_TTL = int(os.getenv('QUERY_CACHE_TTL', 3600))
+# Memory the cached row positions may take per process; a larger single result is not cached
+QUERY_CACHE_MAX_BYTES = int(os.getenv('QUERY_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+SEARCH_MODES = ["🔎 Contains", "🏆 Best match", "🧩 Fuzzy", "🧱 Whole words"]
+
+# "All vocabularies" searches every vocabulary at once, one thread each, keeping
+# at most ALL_VOCABULARIES_MAX_ROWS contains-matches from each
+ALL_VOCABULARIES = "🌐 All vocabularies"
+SEARCH_WORKERS = 3
+ALL_VOCABULARIES_MAX_ROWS = 1000
+
+# Columns offered as type-ahead suggestions under the search box
+SUGGESTION_COLUMNS = ['concept_name', 'concept_name_vi', 'concept_code']
+MAX_SUGGESTIONS = 5
+
 ROWS_PER_PAGE_OPTIONS = [50, 100, 250, 500]
 
+APP_MODES = ["🔍 Search", "📑 Batch mapping"]
+
+# Rows of a batch mapping result previewed on screen (the download has all of them)
+BATCH_PREVIEW_ROWS = 1000
+
+# Background threads that warm up the vocabularies not selected yet
+PREFETCH_WORKERS = 2
+
+# How often (seconds) a running app or API looks for changed vocabulary files and
+# swaps in the new version in the background
+REFRESH_CHECK_SECONDS = int(os.getenv('REFRESH_CHECK_SECONDS', 30))
+
+# Download formats; exports are generated on click, this many rows at a time
+EXPORT_FORMATS = {
+    "CSV": {"kind": "csv", "extension": "csv", "mime": "text/csv"},
+    "CSV (gzip)": {"kind": "csv.gz", "extension": "csv.gz", "mime": "application/gzip"},
+    "Parquet": {"kind": "parquet", "extension": "parquet", "mime": "application/vnd.apache.parquet"}
+}
+EXPORT_CHUNK_ROWS = 50000
+
+# Translation files may list a code more than once (the ICD-10 workbook has both "Mã" and
+# "Mã nhánh" rows). Each concept gets one name: the "first" or "last" listed, or "join" for
+# all distinct names separated by TRANSLATION_JOIN_SEPARATOR
+TRANSLATION_DUPLICATES = os.getenv('TRANSLATION_DUPLICATES', 'first')
+TRANSLATION_JOIN_SEPARATOR = " | "
+
+# Keep a memory-mappable copy of each merged vocabulary and its search index next to the
+# cache (Arrow IPC and .npy), so processes on one host share them through the page cache
+MAPPED_CACHE = os.getenv('MAPPED_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+# Rows of an Athena concept.csv read at a time when splitting it per vocabulary
+# (split_concepts.py); also the size of the row groups written
+CONCEPT_CHUNK_ROWS = 500000
+
+# Opt-in timing of the hot path (loading, search, filters, statistics, export, rendering):
+# shown in a sidebar panel and logged as one JSON object per line to INSTRUMENTATION_LOG
+# (stderr when unset)
+INSTRUMENTATION = os.getenv('INSTRUMENTATION', '').lower() in ('1', 'true', 'yes', 'on')
+INSTRUMENTATION_LOG = os.getenv('INSTRUMENTATION_LOG')
+
 # Vocabulary information
 VOCABULARY_INFO = {
     "🔍 SNOMED CT": {
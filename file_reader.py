@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import streamlit as st
 from pathlib import Path
+from utils.ui_components import render_download_button
 
 st.set_page_config(page_title="Đọc các file CSV", layout="wide")
 
@@ -90,13 +91,12 @@ with st.expander("🔎 Thống kê nhanh"):
     st.write("5 dòng đầu:")
     st.dataframe(df.head())
 
-# Tải xuống
-csv_export = df_filtered.to_csv(index=False).encode('utf-8-sig')
-st.download_button(
-    "⬇️ Tải dữ liệu (CSV UTF-8-SIG)",
-    data=csv_export,
-    file_name=f"filtered_{file_chọn}",
-    mime="text/csv"
+# Tải xuống (file chỉ được tạo khi bấm nút, theo từng khối dòng)
+render_download_button(
+    df_filtered,
+    f"filtered_{Path(file_chọn).stem}",
+    label="⬇️ Tải dữ liệu (CSV UTF-8-SIG)",
+    encoding='utf-8-sig'
 )
 
 st.caption("✅ Hoàn tất. Bạn có thể chọn file khác hoặc thay đổi từ khóa để lọc.")
\ No newline at end of file
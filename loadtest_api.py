@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Load test for the HTTP lookup API (api.py).
+
+Keeps a fixed number of requests in flight against a running server for a
+given duration and reports throughput and latency percentiles per scenario.
+
+Usage:
+    uvicorn api:app --workers 1 &
+    python loadtest_api.py --vocab icd --codes A00 I10 E11 --query "tăng huyết áp"
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote, urlencode
+
+import httpx
+import numpy as np
+
+
+async def worker(client, make_request, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        method, url, body = make_request()
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, json=body)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+            continue
+        # A 404 is answered quickly but is not a successful lookup, so it must not inflate req/s
+        if not response.is_success:
+            errors.append(response.status_code)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_scenario(base_url, make_request, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        # Warm up connections before measuring
+        await asyncio.gather(*(client.get("/health") for _ in range(concurrency)))
+
+        deadline = time.perf_counter() + duration
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            worker(client, make_request, deadline, latencies, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': float(np.percentile(ms, 50)) if len(ms) else None,
+        'p95_ms': float(np.percentile(ms, 95)) if len(ms) else None,
+        'p99_ms': float(np.percentile(ms, 99)) if len(ms) else None
+    }
+
+
+def format_ms(value):
+    return "n/a" if value is None else f"{value:.2f} ms"
+
+
+def scenarios(args):
+    """Build the request generators for each endpoint."""
+    return {
+        'lookup': lambda: ("GET", f"/lookup/{args.vocab}/{quote(random.choice(args.codes))}", None),
+        'search': lambda: ("GET", f"/search/{args.vocab}?{urlencode({'q': random.choice(args.query), 'limit': args.limit})}", None),
+        'batch': lambda: ("POST", f"/lookup/{args.vocab}", {"codes": random.choices(args.codes, k=args.batch_size)})
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the vocabulary lookup API.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="Base URL of the API")
+    parser.add_argument("--vocab", default="icd", help="Vocabulary key (snomed, loinc, icd)")
+    parser.add_argument("--codes", nargs="+", default=["A00", "I10", "E11", "J18.9"], help="Codes to look up")
+    parser.add_argument("--query", nargs="+", default=["diabetes", "hypertension", "tả"], help="Search queries")
+    parser.add_argument("--scenario", nargs="+", default=["lookup", "search", "batch"],
+                        help="Scenarios to run: lookup, search, batch")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--limit", type=int, default=20, help="Search result limit")
+    parser.add_argument("--batch-size", type=int, default=100, help="Codes per batch request")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    available = scenarios(args)
+    results = {}
+    for name in args.scenario:
+        if name not in available:
+            parser.error(f"unknown scenario {name!r}")
+        results[name] = asyncio.run(run_scenario(args.url, available[name], args.concurrency, args.duration))
+        if not args.json:
+            r = results[name]
+            print(f"{name:8} {r['requests']:>8,} req  {r['rps']:>9,.0f} req/s  "
+                  f"p50 {format_ms(r['p50_ms'])}  p95 {format_ms(r['p95_ms'])}  p99 {format_ms(r['p99_ms'])}  "
+                  f"errors {r['errors']}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
 from pathlib import Path
+from utils.ui_components import render_download_button, render_pagination
 
 st.set_page_config(page_title="Snomed Mapping", layout="wide")
 BASE_DIR = Path("/Users/thanhphucphan/Library/CloudStorage/OneDrive-umc.edu.vn/OHDSI/Vocab mapping_Aug2025/python")
@@ -63,14 +64,8 @@ st.write(f"Memory usage: {sno_df.memory_usage(deep=True).sum() / 1024**2:.2f} MB
 
 # Add pagination for large datasets
 rows_per_page = st.selectbox("Rows per page:", [100, 500, 1000, 5000], index=1)
-total_pages = (len(sno_df) - 1) // rows_per_page + 1
-page = st.selectbox(f"Page (1 to {total_pages}):", range(1, total_pages + 1))
-
-start_idx = (page - 1) * rows_per_page
-end_idx = min(start_idx + rows_per_page, len(sno_df))
-
-st.subheader(f"Showing rows {start_idx + 1} to {end_idx} of {len(sno_df):,}")
-st.dataframe(sno_df.iloc[start_idx:end_idx], use_container_width=True)
+page_df = render_pagination(sno_df, rows_per_page, "snomed")
+st.dataframe(page_df, use_container_width=True)
 
 # đếm số lượng nunique của concept_code và concept_name_vi
 if 'concept_code' in sno_df.columns:
@@ -78,15 +73,9 @@ if 'concept_code' in sno_df.columns:
 if 'concept_name_vi' in sno_df.columns:
     st.write(f'Số lượng concept_name_vi: {sno_df["concept_name_vi"].nunique():,}')
 
-# Add download option
-@st.cache_data
-def convert_df(df):
-    return df.to_csv(index=False).encode('utf-8')
-
-csv_data = convert_df(sno_df)
-st.download_button(
-    label="Download full dataset as CSV",
-    data=csv_data,
-    file_name='snomed_mapping_result.csv',
-    mime='text/csv',
+# Add download option, built in chunks only when the button is clicked
+render_download_button(
+    sno_df,
+    'snomed_mapping_result',
+    label="Download full dataset"
 )
\ No newline at end of file
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Split an Athena concept.csv into one df_grouped_<VOCABULARY> file per vocabulary.
+
+Streams the release in chunks with fixed column types and partitions it
+in a single pass, so memory stays bounded however large concept.csv is.
+Parquet output is picked up by the portal in place of the CSV of the
+same name.
+
+Usage:
+    python split_concepts.py athena/concept.csv                         # every vocabulary, Parquet, into the data directory
+    python split_concepts.py athena/concept.csv SNOMED LOINC ICD10      # only these vocabulary_ids
+    python split_concepts.py athena/concept.csv --format csv --output-dir out
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from config import BASE_DIR, CONCEPT_CHUNK_ROWS
+from utils.ingest import OUTPUT_FORMATS, partition_file_name, split_concepts
+
+
+def main():
+    """Split concept.csv into per-vocabulary files."""
+    parser = argparse.ArgumentParser(description="Split an Athena concept.csv per vocabulary_id")
+    parser.add_argument("concept_csv", type=Path, help="Tab-separated concept.csv from an Athena download")
+    parser.add_argument("vocabularies", nargs="*", help="vocabulary_id values to keep (default: all)")
+    parser.add_argument("--output-dir", type=Path, default=BASE_DIR, help=f"Where to write the files (default: {BASE_DIR})")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="parquet", help="Output format (default: parquet)")
+    parser.add_argument("--chunk-rows", type=int, default=CONCEPT_CHUNK_ROWS,
+                        help=f"Rows read at a time (default: {CONCEPT_CHUNK_ROWS:,})")
+    args = parser.parse_args()
+    
+    if not args.concept_csv.is_file():
+        parser.error(f"{args.concept_csv} not found")
+    if args.chunk_rows <= 0:
+        parser.error("--chunk-rows must be positive")
+    
+    start = time.perf_counter()
+    
+    def progress(rows, bytes_read, total_bytes):
+        elapsed = time.perf_counter() - start
+        print(f"\r  {rows:,} rows read ({bytes_read / total_bytes:.0%}, {rows / elapsed:,.0f} rows/s)",
+              end="", file=sys.stderr, flush=True)
+    
+    print(f"✂️  Splitting {args.concept_csv} into {args.output_dir}")
+    counts = split_concepts(
+        args.concept_csv, args.output_dir, args.vocabularies or None,
+        fmt=args.format, chunk_rows=args.chunk_rows, progress=progress
+    )
+    print(file=sys.stderr)
+    
+    for vocabulary_id, rows in counts.items():
+        print(f"  - {partition_file_name(vocabulary_id, args.format)}: {rows:,} concepts")
+    
+    missing = sorted(set(args.vocabularies) - set(counts))
+    if missing:
+        print(f"⚠️ No concepts found for: {', '.join(missing)}")
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
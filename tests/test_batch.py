@@ -0,0 +1,59 @@
+import io
+import pandas as pd
+import pytest
+from utils.batch import map_codes, mapping_summary, read_code_file
+from utils.search_index import build_search_index
+
+
+def upload(data, name="codes.csv"):
+    uploaded = io.BytesIO(data)
+    uploaded.name = name
+    return uploaded
+
+
+@pytest.mark.parametrize("data", [b"A00\nI10\nE11\n", b"A00.1\nA00.9\nI10\n"])
+def test_single_column_without_header_keeps_every_code(data):
+    df = read_code_file(upload(data), header=False)
+    assert list(df.columns) == ["Column 1"]
+    assert df["Column 1"].tolist() == data.decode().split()
+
+
+def test_single_column_with_header():
+    df = read_code_file(upload(b"code\nA00\nI10\n"))
+    assert list(df.columns) == ["code"]
+    assert df["code"].tolist() == ["A00", "I10"]
+
+
+@pytest.mark.parametrize("sep", [",", ";", "\t", "|"])
+def test_delimited_columns(sep):
+    data = f"code{sep}name\nA00.1{sep}Cholera\nI10{sep}Hypertension\n".encode()
+    df = read_code_file(upload(data))
+    assert list(df.columns) == ["code", "name"]
+    assert df["code"].tolist() == ["A00.1", "I10"]
+
+
+def vocabulary():
+    df = pd.DataFrame({
+        "concept_id": [45678, 1000, 12],
+        "concept_code": ["I10", "E11", "A00.1"],
+        "concept_name": ["Essential hypertension", "Type 2 diabetes", "Cholera"],
+        "concept_name_vi": ["Tăng huyết áp", None, "Bệnh tả"]
+    })
+    return df, build_search_index(df)
+
+
+def test_map_codes_by_code_keeps_input_order_and_misses():
+    df, index = vocabulary()
+    result = map_codes(df, index, ["a00.1", "X99", "I10", "I10"])
+    assert result["input_code"].tolist() == ["a00.1", "X99", "I10", "I10"]
+    assert result["matched"].tolist() == [True, False, True, True]
+    assert result["concept_id"].tolist() == [12, pd.NA, 45678, 45678]
+    assert mapping_summary(result) == {"total": 4, "matched": 3, "missing": 1, "match_rate": 75.0}
+
+
+def test_map_codes_by_concept_id_accepts_whole_numbers_only():
+    df, index = vocabulary()
+    codes = ["45678", 1000, " 0012 ", "45678.7", "1e3", "-12", "99999999999999999999", None, "abc"]
+    result = map_codes(df, index, codes, match_on="concept_id")
+    assert result["matched"].tolist() == [True, True, True] + [False] * 6
+    assert result["concept_id"].tolist()[:3] == [45678, 1000, 12]
@@ -0,0 +1,75 @@
+import math
+import re
+import numpy as np
+import pandas as pd
+import pytest
+from config import BM25_B, BM25_K1
+from utils.search_index import MIN_PREFIX_LENGTH, TokenIndex
+
+NAMES = [
+    "Cholera", "Chimera", "Sclera disorder", "Vera", "Era of fever", "Fever",
+    "Diabetes mellitus type 2", "Diabetes type 12", "Type 2 fever", "Scarlet fever fever",
+    "Feverish", "Hypertension", "Essential hypertension", "Hyperthyroidism", None
+]
+CODES = ["A00", "B01", "C02", "D03", "E04", "F05", "E11", "E12", "G08", "A38", "R50", "I10", "I10.1", "E05", "X00"]
+
+QUERIES = [
+    "era fever", "type 2", "fever", "hyper", "hypertension", "feve", "ty", "2 diabetes", "era", "zzz", "fever fever"
+]
+
+
+def tokens(text):
+    return re.findall(r'\w+', text.lower()) if isinstance(text, str) else []
+
+
+def reference_scores(counted_texts, other_texts, query, prefix_weight=0.5):
+    """Brute-force BM25 over whole rows, written independently of the CSR index."""
+    docs = [tokens(text) for text in counted_texts]
+    others = [tokens(text) for text in other_texts]
+    n_rows = len(docs)
+    avg_length = sum(map(len, docs)) / n_rows
+    vocabulary = {term for doc in docs + others for term in doc}
+    
+    scores = np.zeros(n_rows)
+    query_tokens = tokens(query)
+    for i, token in enumerate(query_tokens):
+        expand = i == len(query_tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH
+        matched = [term for term in vocabulary if term == token or (expand and term.startswith(token))]
+        for term in matched:
+            weight = 1.0 if term == token else prefix_weight
+            doc_freq = sum(term in doc for doc in docs)
+            idf = math.log1p((n_rows - doc_freq + 0.5) / (doc_freq + 0.5))
+            for row, doc in enumerate(docs):
+                tf = doc.count(term)
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / avg_length)
+                    scores[row] += idf * weight * tf * (BM25_K1 + 1) / (tf + norm)
+    return scores
+
+
+@pytest.fixture(scope="module")
+def index():
+    names = pd.Series(NAMES, dtype=pd.StringDtype("pyarrow")).str.lower()
+    codes = pd.Series(CODES, dtype=pd.StringDtype("pyarrow")).str.lower()
+    return TokenIndex.from_texts([names, codes], counted=[True, False])
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_bm25_matches_reference(index, query):
+    expected = reference_scores(NAMES, CODES, query)
+    np.testing.assert_allclose(index.bm25_scores(query), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_non_final_tokens_match_whole_terms_only(index):
+    scores = index.bm25_scores("era fever")
+    for name in ["Cholera", "Chimera", "Sclera disorder", "Vera"]:
+        assert scores[NAMES.index(name)] == 0
+    assert scores[NAMES.index("Era of fever")] > scores[NAMES.index("Fever")]
+
+
+def test_short_last_token_is_not_a_suffix_match(index):
+    scores = index.bm25_scores("type 2")
+    assert scores[NAMES.index("Diabetes type 12")] < scores[NAMES.index("Diabetes mellitus type 2")]
+    assert scores[NAMES.index("Diabetes type 12")] == pytest.approx(
+        index.bm25_scores("type")[NAMES.index("Diabetes type 12")]
+    )
@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+from utils import data_loader, ingest
+from utils.ingest import CONCEPT_DTYPES, apply_release, diff_concepts
+
+
+def concepts(rows):
+    """A partition frame from (concept_id, name, code, valid_end_date, invalid_reason) rows."""
+    return pd.DataFrame([
+        {
+            "concept_id": concept_id, "concept_name": name, "domain_id": "Condition",
+            "vocabulary_id": "SNOMED", "concept_class_id": "Clinical Finding", "standard_concept": "S",
+            "concept_code": code, "valid_start_date": "20020131", "valid_end_date": end,
+            "invalid_reason": reason
+        }
+        for concept_id, name, code, end, reason in rows
+    ]).astype(CONCEPT_DTYPES)
+
+
+OLD = concepts([
+    (1, "Cholera", "63650001", "20991231", None),
+    (2, "Typhoid fever", "4834000", "20991231", None),
+    (3, "Hypertension", "38341003", "20991231", None),
+    (4, "Old concept", "1000", "20991231", None),
+    (5, "Asthma", "195967001", "20991231", None),
+    (6, "Goitre", "3716002", "20991231", None),
+])
+
+
+def test_diff_classifies_each_change():
+    new = concepts([
+        (1, "Cholera", "63650001", "20991231", None),
+        (2, "Typhoid fever", "4834000", "20240101", "D"),
+        (3, "Hypertensive disorder", "38341003", "20991231", None),
+        (5, "Asthma", "195967002", "20991231", None),
+        (6, "Goiter", "3716002", "20240101", "U"),
+        (7, "New concept", "2000", "20991231", None),
+    ])
+    diff = diff_concepts(OLD, new)
+
+    assert diff.added.tolist() == [7]
+    assert diff.removed.tolist() == [4]
+    assert sorted(diff.deprecated.tolist()) == [2, 6]
+    assert sorted(diff.renamed.tolist()) == [3, 6]
+    assert diff.updated.tolist() == [5]
+    assert diff.unchanged == 1
+    assert not diff.empty
+
+
+def test_identical_releases_have_no_changes():
+    diff = diff_concepts(OLD, OLD.copy())
+    assert diff.empty
+    assert diff.summary() == {
+        "added": 0, "removed": 0, "deprecated": 0, "renamed": 0, "updated": 0, "unchanged": len(OLD)
+    }
+
+
+def test_old_csv_equals_new_parquet_of_the_same_data(tmp_path):
+    # The old CSV is read with inferred types: integer codes and dates, NaN reasons
+    OLD.to_csv(tmp_path / "old.csv", index=False)
+    OLD.to_parquet(tmp_path / "new.parquet", index=False)
+    old = data_loader.load_table(tmp_path / "old.csv")
+    assert old["concept_code"].dtype == "int64"
+
+    assert diff_concepts(old, data_loader.load_table(tmp_path / "new.parquet")).empty
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(data_loader, "BASE_DIR", tmp_path)
+    monkeypatch.setattr(ingest, "DATA_FILES", {
+        "snomed": {"main": "df_grouped_SNOMED.csv"},
+        "loinc": {"main": "df_grouped_LOINC.csv"}
+    })
+    rebuilt = []
+    monkeypatch.setattr(ingest, "build_vocabulary_cache", rebuilt.extend)
+    OLD.to_csv(tmp_path / "df_grouped_SNOMED.csv", index=False)
+    return tmp_path, rebuilt
+
+
+def write_release(path, frame):
+    frame.to_csv(path, sep="\t", index=False, na_rep="")
+
+
+def test_apply_release_replaces_only_changed_vocabularies(data_dir):
+    base, rebuilt = data_dir
+    release = base / "concept.csv"
+    write_release(release, pd.concat([OLD.iloc[1:], concepts([(7, "New concept", "2000", "20991231", None)])]))
+
+    results = apply_release(release, dry_run=True)
+    assert results["snomed"]["status"] == "changed (dry run)"
+    assert results["snomed"]["diff"].summary()["added"] == 1
+    assert results["loinc"]["status"] == "not in release"
+    assert not (base / "df_grouped_SNOMED.parquet").exists()
+    assert rebuilt == []
+
+    results = apply_release(release)
+    assert results["snomed"]["status"] == "updated"
+    assert results["snomed"]["diff"].removed.tolist() == [1]
+    assert sorted(pd.read_parquet(base / "df_grouped_SNOMED.parquet")["concept_id"]) == [2, 3, 4, 5, 6, 7]
+    assert rebuilt == ["snomed"]
+
+    # The new Parquet partition is what the next release is compared with
+    assert apply_release(release)["snomed"]["status"] == "unchanged"
+    assert rebuilt == ["snomed"]
+    assert not list(base.glob(".release-*"))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+from utils.search import QueryCache, cached_positions
+from utils.search_index import build_search_index
+
+
+def test_entries_are_evicted_beyond_the_byte_budget():
+    cache = QueryCache(maxsize=10, ttl=60, max_bytes=1000)
+    for i in range(3):
+        cache.put(("icd", i), np.arange(100))
+    assert cache.get(("icd", 0)) is None
+    assert cache.get(("icd", 2)).dtype == np.int32
+    assert cache.stats()["bytes"] == 800
+
+    cache.put(("icd", 1), np.arange(10))
+    assert cache.stats()["bytes"] == 440
+    cache.invalidate("icd")
+    assert cache.stats()["bytes"] == 0
+
+
+def test_results_over_the_budget_are_not_cached():
+    cache = QueryCache(maxsize=10, ttl=60, max_bytes=1000)
+    cache.put(("icd", "small"), np.arange(10))
+    cache.put(("icd", "broad"), np.arange(1000))
+    assert cache.get(("icd", "broad")) is None
+    assert cache.get(("icd", "small")) is not None
+
+
+def test_empty_query_is_not_cached():
+    df = pd.DataFrame({
+        "concept_id": [1, 2, 3],
+        "concept_code": ["A00", "A01", "B00"],
+        "concept_name": ["Cholera", "Typhoid fever", "Herpes"],
+        "concept_name_vi": ["Bệnh tả", None, "Nhiễm herpes"]
+    })
+    index, cache = build_search_index(df), QueryCache(maxsize=10, ttl=60)
+    assert cached_positions(df, " ", index, cache, "icd").tolist() == [0, 1, 2]
+    assert cached_positions(df, "", index, cache, "icd", mapped_only=True).tolist() == [0, 2]
+    assert cache.stats()["size"] == 0
+
+    assert cached_positions(df, "a0", index, cache, "icd").tolist() == [0, 1]
+    assert cache.stats()["size"] == 1
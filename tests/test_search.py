@@ -0,0 +1,48 @@
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+import pytest
+from utils.search import IncrementalSearch, QueryCache, match_mask, search_all_vocabularies, search_positions
+from utils.search_index import build_search_index
+
+
+@pytest.fixture
+def vocabulary():
+    df = pd.DataFrame({
+        "concept_id": [1011, 1012, 1013, 1099, 1100],
+        "concept_code": ["E11", "E11.9", "E11.65", "A00", "A00.1"],
+        "concept_name": [
+            "Type 2 diabetes mellitus", "Type 2 diabetes mellitus without complications",
+            "Type 2 diabetes mellitus with hyperglycemia", "Cholera", "Cholera due to Vibrio cholerae 01"
+        ],
+        "concept_name_vi": ["Đái tháo đường típ 2", None, None, "Bệnh tả", "Bệnh tả do Vibrio cholerae 01"],
+        "domain_id": ["Condition", "Condition", "Condition", "Condition", "Observation"]
+    })
+    return df, build_search_index(df)
+
+
+@pytest.mark.parametrize("query", ["E11", "e11", "a00", "A00.1", "1100", "cholera", "diabetes"])
+def test_exact_code_queries_keep_every_contains_match(vocabulary, query):
+    df, index = vocabulary
+    expected = np.flatnonzero(match_mask(df, query.lower()).to_numpy())
+    assert search_positions(df, query, index).tolist() == expected.tolist()
+
+
+def test_code_prefix_and_exact_code_narrow_incrementally(vocabulary):
+    df, index = vocabulary
+    searcher = IncrementalSearch()
+    for query in ["e", "e1", "e11", "e11.", "e11.6"]:
+        assert searcher.positions(df, query, index).tolist() == search_positions(df, query, index).tolist()
+    assert search_positions(df, "e11", index).tolist() == [0, 1, 2]
+
+
+def test_all_vocabularies_statistics_cover_every_match(vocabulary):
+    df, index = vocabulary
+    entries = {
+        name: SimpleNamespace(frame=df, index=index, config_key=name, generation=0)
+        for name in ("ICD-10", "LOINC")
+    }
+    results, counts, stats = search_all_vocabularies(entries, "", QueryCache(), limit=2)
+    assert len(results) == 4
+    assert counts == {"ICD-10": 5, "LOINC": 5}
+    assert stats == {"total_results": 10, "mapped_count": 6, "coverage": 60.0, "unique_domains": 2}
@@ -0,0 +1,51 @@
+import os
+import pandas as pd
+import pytest
+from utils import tokenizer
+from utils.search import query_words, word_positions
+from utils.search_index import build_search_index
+
+
+@pytest.fixture
+def word_list(tmp_path, monkeypatch):
+    path = tmp_path / "words.txt"
+    monkeypatch.setitem(tokenizer.TOKENIZER_DICTIONARIES, "vietnamese", path)
+
+    def write(*words, mtime_ns):
+        path.write_text('\n'.join(words) + '\n', encoding='utf-8')
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    return write
+
+
+def vocabulary():
+    return pd.DataFrame({
+        "concept_id": [1, 2],
+        "concept_code": ["I10", "I95"],
+        "concept_name": ["Essential hypertension", "Hypotension"],
+        "concept_name_vi": ["Bệnh tăng huyết áp", "Hạ huyết áp"]
+    })
+
+
+def test_editing_the_word_list_rebuilds_the_segmentation(word_list):
+    word_list("tăng huyết áp", "huyết áp", mtime_ns=1_000_000_000)
+    assert tokenizer.get_tokenizer("vietnamese").words("bệnh tăng huyết áp") == ["bệnh", "tăng_huyết_áp"]
+    assert query_words("tang huyet ap", fold_accents=True) == ["tang_huyet_ap"]
+    index = build_search_index(vocabulary())
+    assert index.segmented["concept_name_vi"].tolist() == ["bệnh tăng_huyết_áp", "hạ huyết_áp"]
+
+    word_list("hạ huyết áp", mtime_ns=2_000_000_000)
+    assert tokenizer.get_tokenizer("vietnamese").words("bệnh tăng huyết áp") == ["bệnh", "tăng", "huyết", "áp"]
+    assert query_words("tang huyet ap", fold_accents=True) == ["tang", "huyet", "ap"]
+    index = build_search_index(vocabulary())
+    assert index.segmented["concept_name_vi"].tolist() == ["bệnh tăng huyết áp", "hạ_huyết_áp"]
+    assert word_positions(vocabulary(), "tăng huyết áp", index).tolist() == [0]
+
+
+def test_missing_word_list_segments_into_syllables(word_list):
+    assert tokenizer.get_tokenizer("vietnamese").words("tăng huyết áp") == ["tăng", "huyết", "áp"]
+
+
+def test_unknown_tokenizer():
+    with pytest.raises(ValueError):
+        tokenizer.get_tokenizer("thai")
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+from config import TRANSLATION_JOIN_SEPARATOR
+from utils.data_loader import translate_codes
+
+
+def series(values):
+    return pd.Series(values, dtype=object)
+
+
+CODES = series(["A00", "B01", "C02", "D03"])
+VI_CODES = series(["A00", "A00", "B01", "A00", "E04"])
+VI_NAMES = series(["tả 1", "tả 2", "thủy đậu", "tả 2", "thừa"])
+
+
+@pytest.mark.parametrize("duplicates, expected", [
+    ("first", ["tả 1", "thủy đậu", None, None]),
+    ("last", ["tả 2", "thủy đậu", None, None]),
+    ("join", [f"tả 1{TRANSLATION_JOIN_SEPARATOR}tả 2", "thủy đậu", None, None]),
+])
+def test_duplicate_policies(duplicates, expected):
+    names, _ = translate_codes(CODES, VI_CODES, VI_NAMES, duplicates=duplicates)
+    assert names.astype(object).where(names.notna(), None).tolist() == expected
+
+
+def test_join_statistics():
+    _, stats = translate_codes(CODES, VI_CODES, VI_NAMES)
+    assert stats == {
+        "concepts": 4,
+        "matched": 2,
+        "unmatched": 2,
+        "translations": 5,
+        "duplicated_codes": 1,
+        "duplicate_rows_dropped": 2,
+        "unused_translations": 1
+    }
+
+
+def test_names_stay_aligned_with_the_concept_index():
+    codes = pd.Series(["B01", "A00"], index=[10, 3], dtype=object)
+    names, _ = translate_codes(codes, VI_CODES, VI_NAMES)
+    assert names.index.tolist() == [10, 3]
+    assert names.tolist() == ["thủy đậu", "tả 1"]
+
+
+def test_missing_codes_and_names_never_match():
+    codes = series(["A00", None, np.nan, "B01", 123])
+    vi_codes = series(["A00", "A00", None, np.nan, "B01", "123"])
+    vi_names = series([None, "tả", "không mã", "không mã", np.nan, "số"])
+    names, stats = translate_codes(codes, vi_codes, vi_names)
+
+    # A translation without a name is skipped, so a later named row for the code is used
+    assert names.iloc[0] == "tả"
+    assert names.iloc[1:4].isna().all()
+    # Codes are compared as text, so a numeric code finds its translation
+    assert names.iloc[4] == "số"
+    assert stats["matched"] == 2
+    assert stats["translations"] == 2
+    assert stats["duplicated_codes"] == 0
+
+
+def test_first_policy_equals_a_merge_deduplicated_on_first_occurrence():
+    rng = np.random.default_rng(0)
+    codes = series([f"C{i}" for i in rng.integers(0, 300, 500)])
+    vi = pd.DataFrame({
+        "code": [f"C{i}" for i in rng.integers(0, 400, 600)],
+        "name": [f"tên {i}" for i in range(600)]
+    })
+    names, _ = translate_codes(codes, vi["code"], vi["name"], duplicates="first")
+
+    merged = pd.DataFrame({"code": codes}).merge(vi.drop_duplicates("code"), on="code", how="left")
+    assert names.tolist() == merged["name"].where(merged["name"].notna(), None).tolist()
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        translate_codes(CODES, VI_CODES, VI_NAMES, duplicates="longest")
@@ -0,0 +1,109 @@
+import csv
+import re
+import numpy as np
+import pandas as pd
+
+# Separators accepted in a pasted code list
+PASTE_SEPARATORS = r'[\r\n,;\t]+'
+
+# Delimiters an uploaded CSV may use; a file without one is a single column of codes
+CODE_FILE_DELIMITERS = ',;\t|'
+SNIFF_BYTES = 64 * 1024
+
+# A concept ID to look up: digits only, leading zeros allowed, at most 18 significant digits
+CONCEPT_ID_PATTERN = r'0*[0-9]{1,18}'
+
+
+def parse_pasted_codes(text):
+    """Split pasted text into codes, one per line or separated by commas, semicolons or tabs."""
+    codes = [code.strip() for code in re.split(PASTE_SEPARATORS, text)]
+    return pd.Series([code for code in codes if code], dtype=object)
+
+
+def sniff_delimiter(sample):
+    """Return the CODE_FILE_DELIMITERS character separating the columns of a CSV sample, or None."""
+    # The last line may be cut off mid-row
+    lines = sample.splitlines()
+    sample = '\n'.join(lines[:-1] if len(lines) > 1 else lines)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=CODE_FILE_DELIMITERS).delimiter
+    except csv.Error:
+        return None
+
+
+def read_code_file(uploaded_file, header=True):
+    """Read an uploaded CSV or Excel file of codes as text columns.
+    
+    The delimiter of a CSV is only ever one of CODE_FILE_DELIMITERS; a file
+    with none of them is read as one column, one code per line. Without a
+    ``header`` row, the columns are named "Column 1", "Column 2", ...
+    """
+    name = uploaded_file.name.lower()
+    if name.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(uploaded_file, dtype=str, header=0 if header else None)
+    else:
+        sep = sniff_delimiter(uploaded_file.read(SNIFF_BYTES).decode('utf-8-sig', errors='replace'))
+        uploaded_file.seek(0)
+        if sep is not None:
+            df = pd.read_csv(uploaded_file, dtype=str, sep=sep, header=0 if header else None)
+        else:
+            lines = [line.strip() for line in uploaded_file.read().decode('utf-8-sig', errors='replace').splitlines()]
+            lines = [line for line in lines if line]
+            if header and lines:
+                df = pd.DataFrame({lines[0]: lines[1:]}, dtype=object)
+            else:
+                df = pd.DataFrame({0: lines}, dtype=object)
+    
+    if not header:
+        df.columns = [f"Column {i + 1}" for i in range(len(df.columns))]
+    return df
+
+
+def guess_code_column(df):
+    """Pick the column most likely to hold codes: one named like "code" or "mã", else the first."""
+    for col in df.columns:
+        if re.search(r'code|mã|ma_', str(col), re.IGNORECASE):
+            return col
+    return df.columns[0] if len(df.columns) else None
+
+
+def map_codes(df, index, codes, match_on="concept_code"):
+    """Resolve a list of codes (or concept IDs) against a vocabulary in one vectorized join.
+    
+    Returns one row per input, in input order, with the input value, a
+    ``matched`` flag and the concept columns (empty for misses).
+    """
+    codes = pd.Series(codes, dtype=object).reset_index(drop=True)
+    
+    if match_on == "concept_id":
+        # Only whole numbers that fit in int64 are concept IDs: "45678.7" must not match 45678
+        ids = codes.astype(str).str.strip()
+        valid = ids.str.fullmatch(CONCEPT_ID_PATTERN).to_numpy(dtype=bool, na_value=False)
+        positions = np.full(len(codes), -1, dtype=np.int64)
+        positions[valid] = index.lookup.id_positions(ids[valid].astype(np.int64).to_numpy())
+    else:
+        positions = index.lookup.code_positions(codes)
+    
+    matched = positions >= 0
+    concepts = df.iloc[positions[matched]].set_axis(np.flatnonzero(matched)).reindex(range(len(codes)))
+    if 'concept_id' in concepts.columns:
+        # Misses leave gaps, so keep IDs as nullable integers rather than floats
+        concepts['concept_id'] = concepts['concept_id'].astype('Int64')
+    
+    result = pd.concat([
+        pd.DataFrame({'input_code': codes, 'matched': matched}),
+        concepts
+    ], axis=1)
+    return result
+
+
+def mapping_summary(result):
+    """Count inputs, hits and misses of a map_codes result."""
+    total = len(result)
+    matched = int(result['matched'].sum()) if total else 0
+    return {
+        'total': total,
+        'matched': matched,
+        'missing': total - matched,
+        'match_rate': (matched / total * 100) if total else 0
+    }
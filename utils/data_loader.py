@@ -1,10 +1,25 @@
+import contextlib
+import importlib.util
+import json
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 from pathlib import Path
-from config import BASE_DIR, DATA_FILES
+from config import (
+    BASE_DIR, CACHE_DIR, CATEGORICAL_COLUMNS, DATA_FILES, MAPPED_CACHE, TEXT_COLUMNS, TRANSLATION_DUPLICATES,
+    TRANSLATION_JOIN_SEPARATOR, VIETNAMESE_DICTIONARY
+)
+from utils.instrumentation import stage
+from utils.search_index import (
+    arrow_to_frame, build_search_index, open_search_index, read_arrow, save_search_index, write_arrow
+)
 
 
-@st.cache_data(show_spinner=False)
 def load_csv(file_path):
     """Load CSV file with error handling."""
     try:
@@ -27,6 +42,31 @@ def load_csv(file_path):
         return pd.DataFrame()
 
 
+def load_table(file_path):
+    """Load a Parquet or CSV file with error handling."""
+    if file_path.suffix != ".parquet":
+        return load_csv(file_path)
+    
+    try:
+        return pd.read_parquet(file_path)
+    except FileNotFoundError:
+        st.error(f"📁 {file_path.name} not found")
+        return pd.DataFrame()
+    except Exception as e:
+        st.error(f"Error reading {file_path.name}: {e}")
+        return pd.DataFrame()
+
+
+def source_path(config, role):
+    """Path of a vocabulary source file; the main file's Parquet split (see split_concepts.py) wins over its CSV."""
+    path = BASE_DIR / config[role]
+    if role == "main":
+        columnar = path.with_suffix(".parquet")
+        if columnar.exists():
+            return columnar
+    return path
+
+
 def reorder_columns(df):
     """Reorder columns in the specified order and remove unwanted columns."""
     from config import DISPLAY_COLUMNS
@@ -35,35 +75,329 @@ def reorder_columns(df):
     return df[available_columns]
 
 
-@st.cache_data
-def load_vocabulary_data(vocab_type):
-    """Load and merge vocabulary data with Vietnamese translations."""
+def compact_frame(df):
+    """Store repeated labels as categoricals and free text as Arrow-backed strings."""
+    dtypes = {col: "category" for col in CATEGORICAL_COLUMNS if col in df.columns}
+    dtypes.update({col: pd.StringDtype("pyarrow") for col in TEXT_COLUMNS if col in df.columns})
+    return df.astype(dtypes)
+
+
+# Bump when the layout of the cached frames changes so stale artifacts are rebuilt
+CACHE_FORMAT_VERSION = 5
+
+VOCAB_MAP = {
+    "🔍 SNOMED CT": "snomed",
+    "🧬 LOINC": "loinc",
+    "📋 ICD-10": "icd"
+}
+
+
+def source_signature(config_key):
+    """Describe the source files of a vocabulary by name, size and modification time.
     
-    # Map vocabulary type to config key
-    vocab_map = {
-        "🔍 SNOMED CT": "snomed",
-        "🧬 LOINC": "loinc", 
-        "📋 ICD-10": "icd"
+    The Vietnamese word list counts as a source too: the memory-mapped
+    search index holds the names segmented with it.
+    """
+    config = DATA_FILES[config_key]
+    signature = {
+        "format": CACHE_FORMAT_VERSION,
+        "config": config,
+        "sources": {}
     }
     
-    config_key = vocab_map.get(vocab_type)
+    paths = {role: source_path(config, role) for role in ("main", "vietnamese")}
+    paths["dictionary"] = VIETNAMESE_DICTIONARY
+    for role, path in paths.items():
+        try:
+            stat = path.stat()
+            signature["sources"][role] = {"file": path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        except OSError:
+            signature["sources"][role] = {"file": path.name, "size": None, "mtime_ns": None}
+    
+    return signature
+
+
+def cache_paths(config_key):
+    """Return the (data, metadata) paths of the cached frame for a vocabulary."""
+    return CACHE_DIR / f"{config_key}.parquet", CACHE_DIR / f"{config_key}.json"
+
+
+def read_cached_frame(data_path, meta_path, signature):
+    """Read a Parquet frame whose JSON sidecar matches ``signature``, or None if it is missing or stale."""
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            if json.load(f) != signature:
+                return None
+        return pd.read_parquet(data_path)
+    except (OSError, ValueError, ImportError):
+        return None
+
+
+def unique_temp_path(path):
+    """Create an empty file next to ``path`` with a name no other process or thread will use."""
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp", delete=False) as f:
+        return Path(f.name)
+
+
+def write_cached_frame(data_path, meta_path, df, signature):
+    """Write a frame as Parquet with its signature in a JSON sidecar; False if it can't be written."""
+    temporary = []
+    try:
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write to private temporary files first, so readers never see a half-written
+        # artifact and concurrent writers (replicas, a release being applied) never share one
+        tmp_data = unique_temp_path(data_path)
+        temporary.append(tmp_data)
+        tmp_meta = unique_temp_path(meta_path)
+        temporary.append(tmp_meta)
+        df.to_parquet(tmp_data, index=False)
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump(signature, f, ensure_ascii=False)
+        
+        os.replace(tmp_data, data_path)
+        os.replace(tmp_meta, meta_path)
+        return True
+    except (OSError, ValueError, ImportError):
+        # The cache is only an optimization; a read-only data directory is fine
+        return False
+    finally:
+        for path in temporary:
+            with contextlib.suppress(OSError):
+                path.unlink()
+
+
+def read_vocabulary_cache(config_key, signature):
+    """Read the cached frame for a vocabulary, or None if it is missing or stale."""
+    return read_cached_frame(*cache_paths(config_key), signature)
+
+
+def write_vocabulary_cache(config_key, df, signature):
+    """Write a merged frame and its source signature to the cache directory."""
+    return write_cached_frame(*cache_paths(config_key), df, signature)
+
+
+def mapped_path(config_key):
+    """Return the directory holding the memory-mappable frame and search index of a vocabulary."""
+    return CACHE_DIR / f"{config_key}.mapped"
+
+
+def mapped_is_fresh(config_key, signature):
+    """Whether the memory-mapped files of a vocabulary exist and were built from these sources."""
+    try:
+        with open(mapped_path(config_key) / "meta.json", encoding="utf-8") as f:
+            return json.load(f) == signature
+    except (OSError, ValueError):
+        return False
+
+
+def read_mapped_vocabulary(config_key, signature):
+    """Open the memory-mapped (frame, search index) of a vocabulary, or None if missing, stale or disabled.
+    
+    The frame is read from an Arrow IPC file and the index from .npy and
+    Arrow files, all memory-mapped: every process serving the vocabulary
+    shares the same pages, and opening them involves no parsing.
+    """
+    if not MAPPED_CACHE:
+        return None
+    
+    if not mapped_is_fresh(config_key, signature):
+        return None
+    
+    directory = mapped_path(config_key)
+    try:
+        df = arrow_to_frame(read_arrow(directory / "frame.arrow"))
+        return df, open_search_index(directory, df)
+    except (OSError, ValueError, KeyError, pa.ArrowException):
+        return None
+
+
+def write_mapped_vocabulary(config_key, df, index, signature):
+    """Write a frame and its search index in memory-mappable form; False if they can't be written.
+    
+    Files are written to a private directory that then replaces the
+    current one, so readers never see a half-written vocabulary. Processes
+    that have the old files mapped keep reading them until they reload.
+    """
+    if not MAPPED_CACHE:
+        return False
+    
+    directory = mapped_path(config_key)
+    unique = f"{os.getpid()}-{threading.get_ident()}"
+    staging = directory.with_name(f"{directory.name}.tmp-{unique}")
+    retired = directory.with_name(f"{directory.name}.old-{unique}")
+    try:
+        staging.mkdir(parents=True)
+        write_arrow(staging / "frame.arrow", pa.Table.from_pandas(df, preserve_index=False))
+        save_search_index(index, staging)
+        # The signature goes last: a directory without it is never read
+        with open(staging / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(signature, f, ensure_ascii=False)
+        
+        if directory.exists():
+            os.replace(directory, retired)
+        os.replace(staging, directory)
+        return True
+    except (OSError, ValueError, pa.ArrowException):
+        # Like the Parquet cache, this is only an optimization
+        return False
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(retired, ignore_errors=True)
+
+
+def excel_engine():
+    """Return the fastest available Excel reader: calamine if installed (pandas 2.2+), else pandas' default."""
+    pandas_version = tuple(int(part) for part in pd.__version__.split('.')[:2])
+    if pandas_version >= (2, 2) and importlib.util.find_spec("python_calamine") is not None:
+        return "calamine"
+    return None
+
+
+def parquet_safe(df):
+    """Store object columns that mix types (e.g. numeric and text codes) as text, as Parquet requires."""
+    for col in df.columns:
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True).startswith("mixed"):
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def read_workbook(path):
+    """Read an Excel workbook through a Parquet copy converted on first use.
+    
+    The copy lives in the cache directory and is used as long as the
+    workbook's size and modification time are unchanged; otherwise the
+    workbook is read again and reconverted.
+    """
+    stat = path.stat()
+    signature = {
+        "format": CACHE_FORMAT_VERSION,
+        "file": path.name,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns
+    }
+    data_path, meta_path = CACHE_DIR / f"{path.name}.parquet", CACHE_DIR / f"{path.name}.json"
+    
+    df = read_cached_frame(data_path, meta_path, signature)
+    if df is None:
+        df = parquet_safe(pd.read_excel(path, engine=excel_engine()))
+        write_cached_frame(data_path, meta_path, df, signature)
+    
+    return df
+
+
+def build_vocabulary_cache(config_keys=None, force=False):
+    """Build cached frames for the given vocabularies, skipping fresh ones unless forced."""
+    results = {}
+    
+    for config_key in config_keys or DATA_FILES.keys():
+        signature = source_signature(config_key)
+        
+        df = None if force else read_vocabulary_cache(config_key, signature)
+        if df is not None:
+            status = "fresh"
+        else:
+            df = build_vocabulary_frame(config_key)
+            if df.empty:
+                results[config_key] = "failed"
+                continue
+            status = "built" if write_vocabulary_cache(config_key, df, signature) else "not written"
+            stats = df.attrs.get("translation_join")
+            if stats:
+                status += (
+                    f" ({stats['matched']:,} of {stats['concepts']:,} concepts translated, "
+                    f"{stats['duplicated_codes']:,} codes listed more than once)"
+                )
+        
+        # Prebuilt mapped files let every server process open the vocabulary without parsing or indexing
+        if MAPPED_CACHE and (force or not mapped_is_fresh(config_key, signature)):
+            written = write_mapped_vocabulary(config_key, df, build_search_index(df), signature)
+            status += ", memory-mapped copy built" if written else ", memory-mapped copy not written"
+        
+        results[config_key] = status
+    
+    return results
+
+
+def resolve_vocabulary(vocab_type):
+    """Map a sidebar label such as "🧬 LOINC" (or a config key) to its config key."""
+    if vocab_type in DATA_FILES:
+        return vocab_type
+    return VOCAB_MAP.get(vocab_type)
+
+
+def load_vocabulary_data(vocab_type):
+    """Load merged vocabulary data, using the on-disk cache when it is fresh.
+    
+    This is not cached in memory; the app gets frames from the shared
+    vocabulary store in utils/store.py, which gets it through
+    ``load_indexed_vocabulary`` once per vocabulary.
+    """
+    
+    config_key = resolve_vocabulary(vocab_type)
     if not config_key:
         st.error(f"Unknown vocabulary type: {vocab_type}")
         return pd.DataFrame()
     
+    signature = source_signature(config_key)
+    df = read_vocabulary_cache(config_key, signature)
+    if df is not None:
+        return df
+    
+    df = build_vocabulary_frame(config_key)
+    if not df.empty:
+        write_vocabulary_cache(config_key, df, signature)
+    
+    return df
+
+
+def load_indexed_vocabulary(vocab_type, signature=None):
+    """Return the merged frame of a vocabulary and its search index.
+    
+    When fresh memory-mapped files exist they are opened directly. Otherwise
+    the frame is loaded and indexed, written in mapped form, and reopened
+    from those files, so even the process that built them shares their pages.
+    """
+    config_key = resolve_vocabulary(vocab_type)
+    signature = signature if signature is not None else source_signature(config_key)
+    
+    with stage("open_mapped_vocabulary", vocabulary=config_key) as record:
+        mapped = read_mapped_vocabulary(config_key, signature)
+        record["rows"] = len(mapped[0]) if mapped is not None else None
+    if mapped is not None:
+        return mapped
+    
+    with stage("load_vocabulary_data", vocabulary=config_key) as record:
+        df = load_vocabulary_data(config_key)
+        record["rows"] = len(df)
+    with stage("build_search_index", vocabulary=config_key, rows=len(df)):
+        index = build_search_index(df)
+    
+    if not df.empty and write_mapped_vocabulary(config_key, df, index, signature):
+        mapped = read_mapped_vocabulary(config_key, signature)
+        if mapped is not None:
+            return mapped
+    
+    return df, index
+
+
+def build_vocabulary_frame(config_key):
+    """Load and merge vocabulary data with Vietnamese translations."""
+    
     config = DATA_FILES[config_key]
+    vocab_name = config["main"]
     
     # Load main vocabulary file
-    main_df = load_csv(BASE_DIR / config["main"])
+    main_df = load_table(source_path(config, "main"))
     
     if main_df.empty:
-        st.error(f"❌ Could not load main vocabulary file for {vocab_type}")
+        st.error(f"❌ Could not load main vocabulary file {vocab_name}")
         return pd.DataFrame()
     
     # Load Vietnamese translation file
     if config_key == "icd":
         try:
-            vi_df = pd.read_excel(BASE_DIR / config["vietnamese"])
+            vi_df = read_workbook(BASE_DIR / config["vietnamese"])
         except FileNotFoundError:
             st.error(f"📁 Vietnamese translation file not found: {config['vietnamese']}")
             vi_df = pd.DataFrame()
@@ -73,23 +407,81 @@ def load_vocabulary_data(vocab_type):
     else:
         vi_df = load_csv(BASE_DIR / config["vietnamese"])
     
-    # Return empty if either file failed to load
-    if main_df.empty:
-        return pd.DataFrame()
-    
     if vi_df.empty:
-        st.warning(f"⚠️ Vietnamese translations not available for {vocab_type}")
+        st.warning(f"⚠️ Vietnamese translations not available for {vocab_name}")
         main_df['concept_name_vi'] = None
-        return reorder_columns(main_df)
+        return compact_frame(reorder_columns(main_df))
     
     # Merge data based on vocabulary type
     main_df = merge_vocabulary_data(main_df, vi_df, config)
     
-    return reorder_columns(main_df) if not main_df.empty else pd.DataFrame()
+    return compact_frame(reorder_columns(main_df)) if not main_df.empty else pd.DataFrame()
+
+
+def join_keys(codes):
+    """Codes as join keys: their string form, with missing codes kept missing so they never match."""
+    return codes.astype(str).where(codes.notna())
+
+
+def translate_codes(codes, vi_codes, vi_names, duplicates=TRANSLATION_DUPLICATES):
+    """Look up the translation of each code; returns (names aligned with ``codes``, join statistics).
+    
+    Both sides are factorized into one integer code space, so the join is a
+    single array lookup instead of a merge on strings. Every code gets at
+    most one name; when the translations list a code more than once
+    ``duplicates`` decides which: "first", "last", or "join" (all distinct
+    names, separated by TRANSLATION_JOIN_SEPARATOR).
+    """
+    if duplicates not in ("first", "last", "join"):
+        raise ValueError(f"unknown duplicate policy {duplicates!r}, expected 'first', 'last' or 'join'")
+    
+    # Translations without a name are no translation at all
+    named = vi_codes.notna().to_numpy() & vi_names.notna().to_numpy()
+    vi_codes, vi_names = vi_codes[named], vi_names[named].reset_index(drop=True)
+    
+    keys, uniques = pd.factorize(pd.concat([join_keys(codes), join_keys(vi_codes)], ignore_index=True))
+    code_keys, vi_keys = keys[:len(codes)], keys[len(codes):]
+    
+    occurrences = pd.Series(vi_keys)
+    repeated = occurrences.duplicated(keep=False).to_numpy()
+    kept = np.flatnonzero(~occurrences.duplicated(keep="last" if duplicates == "last" else "first").to_numpy())
+    
+    if duplicates == "join" and repeated.any():
+        # Only the repeated codes go through a groupby; the rest keep their single name
+        pairs = pd.DataFrame({"key": vi_keys[repeated], "name": vi_names[repeated].astype(str).to_numpy()})
+        joined = pairs.drop_duplicates().groupby("key", sort=False)["name"].agg(TRANSLATION_JOIN_SEPARATOR.join)
+        kept_repeated = kept[repeated[kept]]
+        vi_names = vi_names.astype(object)
+        vi_names.iloc[kept_repeated] = joined.loc[vi_keys[kept_repeated]].to_numpy()
+    
+    # Row of the translation kept for each key, -1 where a key has none
+    row_of_key = np.full(len(uniques), -1, dtype=np.int64)
+    row_of_key[vi_keys[kept]] = kept
+    rows = np.where(code_keys >= 0, row_of_key[code_keys], -1)
+    names = pd.Series(vi_names.array.take(rows, allow_fill=True), index=codes.index)
+    
+    matched = int((rows >= 0).sum())
+    duplicated_codes = int(occurrences[repeated].nunique())
+    stats = {
+        "concepts": len(codes),
+        "matched": matched,
+        "unmatched": len(codes) - matched,
+        "translations": len(vi_keys),
+        "duplicated_codes": duplicated_codes,
+        "duplicate_rows_dropped": int(repeated.sum()) - duplicated_codes,
+        "unused_translations": int((~np.isin(vi_keys[kept], code_keys)).sum())
+    }
+    return names, stats
 
 
 def merge_vocabulary_data(main_df, vi_df, config):
-    """Merge main vocabulary data with Vietnamese translations."""
+    """Merge main vocabulary data with Vietnamese translations.
+    
+    Each concept keeps exactly one row: repeated codes in the translation
+    file are resolved with the TRANSLATION_DUPLICATES policy instead of
+    duplicating concepts. The join statistics are kept in
+    ``df.attrs["translation_join"]``.
+    """
     
     # Check if concept_code column exists in main dataframe
     if 'concept_code' not in main_df.columns:
@@ -97,26 +489,16 @@ def merge_vocabulary_data(main_df, vi_df, config):
         main_df['concept_name_vi'] = None
         return main_df
     
-    # Convert concept_code to string for matching
-    main_df['concept_code'] = main_df['concept_code'].astype(str)
-    vi_df[config["code_column"]] = vi_df[config["code_column"]].astype(str)
-    
     # Check if Vietnamese name column exists
-    if config["name_column"] not in vi_df.columns:
-        st.warning(f"Missing '{config['name_column']}' column in Vietnamese file.")
+    if config["name_column"] not in vi_df.columns or config["code_column"] not in vi_df.columns:
+        st.warning(f"Missing '{config['code_column']}' or '{config['name_column']}' column in Vietnamese file.")
         main_df['concept_name_vi'] = None
         return main_df
     
-    # Perform left join
-    main_df = main_df.merge(
-        vi_df[[config["code_column"], config["name_column"]]],
-        left_on='concept_code',
-        right_on=config["code_column"],
-        how='left'
-    )
-    
-    # Rename Vietnamese column to standard name
-    if config["name_column"] != 'concept_name_vi':
-        main_df.rename(columns={config["name_column"]: 'concept_name_vi'}, inplace=True)
+    with stage("merge_vocabulary_data", rows=len(main_df)) as record:
+        names, stats = translate_codes(main_df['concept_code'], vi_df[config["code_column"]], vi_df[config["name_column"]])
+        record.update(stats)
     
+    main_df = main_df.assign(concept_name_vi=names)
+    main_df.attrs["translation_join"] = stats
     return main_df
@@ -0,0 +1,109 @@
+import codecs
+import io
+import zlib
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import EXPORT_CHUNK_ROWS, EXPORT_FORMATS
+from utils.instrumentation import stage
+
+
+def iter_chunks(df, chunk_rows=EXPORT_CHUNK_ROWS, positions=None):
+    """Yield ``df`` (or only its rows at ``positions``) ``chunk_rows`` rows at a time.
+    
+    Rows are taken out of ``df`` one chunk at a time, so the selected rows
+    are never copied all at once.
+    """
+    total = len(df) if positions is None else len(positions)
+    for start in range(0, total, chunk_rows):
+        if positions is None:
+            yield df.iloc[start:start + chunk_rows]
+        else:
+            yield df.iloc[positions[start:start + chunk_rows]]
+
+
+def iter_csv(df, chunk_rows=EXPORT_CHUNK_ROWS, encoding='utf-8', positions=None):
+    """Yield ``df`` (or its rows at ``positions``) as encoded CSV, ``chunk_rows`` rows at a time."""
+    if encoding.lower().replace('_', '-') == 'utf-8-sig':
+        # The BOM goes once at the start of the file, not before every chunk
+        yield codecs.BOM_UTF8
+        encoding = 'utf-8'
+    
+    yield df.iloc[:0].to_csv(index=False).encode(encoding)
+    for chunk in iter_chunks(df, chunk_rows, positions):
+        yield chunk.to_csv(index=False, header=False).encode(encoding)
+
+
+def iter_gzip(chunks):
+    """Gzip-compress a stream of byte chunks."""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands over what was written since the last ``drain``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet(df, chunk_rows=EXPORT_CHUNK_ROWS, positions=None):
+    """Yield ``df`` (or its rows at ``positions``) as a Parquet file with one row group per ``chunk_rows`` rows."""
+    sink = _ChunkSink()
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in iter_chunks(df, chunk_rows, positions):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(df, export_format, chunk_rows=EXPORT_CHUNK_ROWS, encoding='utf-8', positions=None):
+    """Yield ``df`` (or its rows at ``positions``) in one of EXPORT_FORMATS as a stream of byte chunks."""
+    kind = EXPORT_FORMATS[export_format]['kind']
+    if kind == 'parquet':
+        return iter_parquet(df, chunk_rows, positions)
+    
+    chunks = iter_csv(df, chunk_rows, encoding, positions)
+    return iter_gzip(chunks) if kind == 'csv.gz' else chunks
+
+
+def export_file(df, export_format, chunk_rows=EXPORT_CHUNK_ROWS, encoding='utf-8', positions=None):
+    """Write ``df`` (or its rows at ``positions``) chunk by chunk into an in-memory file, ready for download.
+    
+    Only one chunk is ever taken out of ``df`` and converted at a time, so
+    besides the output itself (much smaller when compressed) memory use
+    stays bounded.
+    """
+    buffer = io.BytesIO()
+    rows = len(df) if positions is None else len(positions)
+    with stage("export", format=export_format, rows=rows) as record:
+        for chunk in iter_export(df, export_format, chunk_rows, encoding, positions):
+            buffer.write(chunk)
+        record["bytes"] = buffer.tell()
+    buffer.seek(0)
+    return buffer
+
+
+def export_file_name(stem, export_format):
+    return f"{stem}.{EXPORT_FORMATS[export_format]['extension']}"
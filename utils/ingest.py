@@ -0,0 +1,272 @@
+import csv
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from config import BASE_DIR, CONCEPT_CHUNK_ROWS, DATA_FILES
+from utils.data_loader import build_vocabulary_cache, load_table, source_path
+
+# Column types of an Athena concept.csv. Codes and flags are text in every
+# vocabulary (codes such as "0001" or "NA" must survive as written), so
+# nothing is left for pandas to guess chunk by chunk.
+CONCEPT_DTYPES = {
+    'concept_id': 'int64',
+    'concept_name': 'string',
+    'domain_id': 'string',
+    'vocabulary_id': 'string',
+    'concept_class_id': 'string',
+    'standard_concept': 'string',
+    'concept_code': 'string',
+    'valid_start_date': 'string',
+    'valid_end_date': 'string',
+    'invalid_reason': 'string'
+}
+
+CONCEPT_SCHEMA = pa.schema([
+    (col, pa.int64() if dtype == 'int64' else pa.string()) for col, dtype in CONCEPT_DTYPES.items()
+])
+
+OUTPUT_FORMATS = ("parquet", "csv")
+
+
+def partition_file_name(vocabulary_id, fmt="parquet"):
+    """File name of a vocabulary's partition, e.g. df_grouped_ICD10.parquet."""
+    return f"df_grouped_{re.sub(r'[^A-Za-z0-9._-]+', '_', vocabulary_id)}.{fmt}"
+
+
+def read_concept_chunks(concept_path, chunk_rows=CONCEPT_CHUNK_ROWS, handle=None):
+    """Yield an Athena concept.csv (tab-separated, unquoted) ``chunk_rows`` rows at a time."""
+    return pd.read_csv(
+        handle if handle is not None else concept_path,
+        sep='\t',
+        dtype=CONCEPT_DTYPES,
+        usecols=list(CONCEPT_DTYPES),
+        # Names may contain quote characters; Athena never quotes fields
+        quoting=csv.QUOTE_NONE,
+        keep_default_na=False,
+        na_values=[''],
+        chunksize=chunk_rows
+    )
+
+
+class PartitionWriter:
+    """Appends frames to one vocabulary's output file, written under a temporary name until ``commit``."""
+
+    def __init__(self, path, fmt):
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._partial = path.with_name(path.name + ".partial")
+        self._writer = None
+        self._file = None
+
+    def write(self, frame):
+        if self.fmt == "parquet":
+            if self._writer is None:
+                self._writer = pq.ParquetWriter(self._partial, CONCEPT_SCHEMA)
+            self._writer.write_table(pa.Table.from_pandas(frame, schema=CONCEPT_SCHEMA, preserve_index=False))
+        else:
+            if self._file is None:
+                self._file = open(self._partial, "w", encoding="utf-8", newline="")
+            frame.to_csv(self._file, index=False, header=self.rows == 0)
+        self.rows += len(frame)
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._file is not None:
+            self._file.close()
+
+    def commit(self):
+        self._close()
+        os.replace(self._partial, self.path)
+
+    def abort(self):
+        self._close()
+        if os.path.exists(self._partial):
+            os.remove(self._partial)
+
+
+def split_concepts(concept_path, output_dir, vocabularies=None, fmt="parquet",
+                   chunk_rows=CONCEPT_CHUNK_ROWS, progress=None):
+    """Partition an Athena concept.csv into one file per ``vocabulary_id`` in a single pass.
+    
+    The file is read ``chunk_rows`` rows at a time and each chunk is split
+    with one groupby, so memory stays bounded by the chunk size however
+    large the release is. Rows are buffered per vocabulary and written in
+    row groups of about ``chunk_rows``. Outputs only replace existing files
+    once the whole input has been read. ``progress(rows, bytes_read, total_bytes)``
+    is called after every chunk. Returns ``{vocabulary_id: rows written}``.
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format {fmt!r}, expected one of {', '.join(OUTPUT_FORMATS)}")
+    
+    wanted = set(vocabularies) if vocabularies else None
+    writers = {}
+    pending = {}
+    pending_rows = 0
+    rows_read = 0
+    total_bytes = os.path.getsize(concept_path)
+
+    def flush(vocabulary_id):
+        nonlocal pending_rows
+        frames = pending.pop(vocabulary_id)
+        if vocabulary_id not in writers:
+            writers[vocabulary_id] = PartitionWriter(output_dir / partition_file_name(vocabulary_id, fmt), fmt)
+        frame = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        writers[vocabulary_id].write(frame)
+        pending_rows -= len(frame)
+    
+    output_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        with open(concept_path, "rb") as handle:
+            for chunk in read_concept_chunks(concept_path, chunk_rows, handle):
+                rows_read += len(chunk)
+                if wanted is not None:
+                    chunk = chunk[chunk['vocabulary_id'].isin(wanted)]
+                
+                for vocabulary_id, part in chunk.groupby('vocabulary_id', sort=False):
+                    pending.setdefault(vocabulary_id, []).append(part)
+                    pending_rows += len(part)
+                
+                # Full row groups go out at once; if many small vocabularies
+                # together hold more than a chunk, everything is written out
+                for vocabulary_id in list(pending):
+                    if pending_rows > chunk_rows or sum(map(len, pending[vocabulary_id])) >= chunk_rows:
+                        flush(vocabulary_id)
+                
+                if progress is not None:
+                    progress(rows_read, handle.tell(), total_bytes)
+        
+        for vocabulary_id in list(pending):
+            flush(vocabulary_id)
+    except BaseException:
+        for writer in writers.values():
+            writer.abort()
+        raise
+    
+    for writer in writers.values():
+        writer.commit()
+    
+    return {vocabulary_id: writer.rows for vocabulary_id, writer in sorted(writers.items())}
+
+
+class ReleaseDiff:
+    """Concept IDs that differ between two versions of a vocabulary partition."""
+
+    def __init__(self, added, removed, deprecated, renamed, updated, unchanged):
+        self.added = added
+        self.removed = removed
+        self.deprecated = deprecated
+        self.renamed = renamed
+        self.updated = updated
+        self.unchanged = unchanged
+
+    @property
+    def empty(self):
+        changes = (self.added, self.removed, self.deprecated, self.renamed, self.updated)
+        return not any(len(ids) for ids in changes)
+
+    def summary(self):
+        return {
+            "added": len(self.added),
+            "removed": len(self.removed),
+            "deprecated": len(self.deprecated),
+            "renamed": len(self.renamed),
+            "updated": len(self.updated),
+            "unchanged": self.unchanged
+        }
+
+
+def diff_concepts(old, new):
+    """Compare two versions of a vocabulary by ``concept_id``.
+    
+    A concept is deprecated when it gains an ``invalid_reason`` or its
+    ``valid_end_date`` moves, renamed when its ``concept_name`` changes,
+    and updated when any other shared column changes. Columns are compared
+    as text, so an old CSV (integer codes and dates) and a new Parquet
+    split of the same data are equal.
+    """
+    columns = [col for col in CONCEPT_DTYPES if col != 'concept_id' and col in old.columns and col in new.columns]
+    old = old.drop_duplicates('concept_id', keep='last').set_index('concept_id')[columns].astype('string')
+    new = new.drop_duplicates('concept_id', keep='last').set_index('concept_id')[columns].astype('string')
+    
+    common = new.index.intersection(old.index)
+    before = old.loc[common]
+    after = new.loc[common]
+    changed = (before != after).fillna(True) & ~(before.isna() & after.isna())
+    
+    none = pd.Series(False, index=common)
+    renamed = changed['concept_name'] if 'concept_name' in changed else none
+    deprecated = none.copy()
+    if 'invalid_reason' in changed:
+        deprecated |= after['invalid_reason'].notna() & before['invalid_reason'].isna()
+    if 'valid_end_date' in changed:
+        deprecated |= changed['valid_end_date']
+    updated = changed.any(axis=1) & ~renamed & ~deprecated
+    
+    return ReleaseDiff(
+        added=new.index.difference(old.index).to_numpy(),
+        removed=old.index.difference(new.index).to_numpy(),
+        deprecated=common[deprecated.to_numpy()].to_numpy(),
+        renamed=common[renamed.to_numpy()].to_numpy(),
+        updated=common[updated.to_numpy()].to_numpy(),
+        unchanged=int((~changed.any(axis=1)).sum())
+    )
+
+
+def partition_vocabulary_id(config):
+    """The ``vocabulary_id`` a vocabulary's main file holds, e.g. "ICD10" for df_grouped_ICD10.csv."""
+    return Path(config["main"]).stem.removeprefix("df_grouped_")
+
+
+def apply_release(concept_path, config_keys=None, dry_run=False, chunk_rows=CONCEPT_CHUNK_ROWS, progress=None):
+    """Update the portal's vocabulary partitions from a new Athena concept.csv.
+    
+    The release is split once into a staging directory next to the data
+    files. Each vocabulary is then diffed against the partition currently
+    on disk, and only vocabularies that changed are replaced, as Parquet,
+    which the loader prefers over the CSV. Their merged cache is rebuilt
+    as well, so running servers swap the new version in (see
+    ``VocabularyStore.check_for_updates``) without merging anything.
+    Returns ``{config_key: {"vocabulary_id", "diff", "status"}}``.
+    """
+    config_keys = list(config_keys or DATA_FILES)
+    vocabulary_ids = {config_key: partition_vocabulary_id(DATA_FILES[config_key]) for config_key in config_keys}
+    results = {}
+    
+    staging = Path(tempfile.mkdtemp(prefix=".release-", dir=BASE_DIR))
+    try:
+        split_concepts(concept_path, staging, vocabulary_ids.values(), chunk_rows=chunk_rows, progress=progress)
+        
+        for config_key, vocabulary_id in vocabulary_ids.items():
+            staged = staging / partition_file_name(vocabulary_id)
+            if not staged.exists():
+                results[config_key] = {"vocabulary_id": vocabulary_id, "diff": None, "status": "not in release"}
+                continue
+            
+            current = load_table(source_path(DATA_FILES[config_key], "main"))
+            if current.empty:
+                current = pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in CONCEPT_DTYPES.items()})
+            diff = diff_concepts(current, pd.read_parquet(staged))
+            
+            if diff.empty:
+                status = "unchanged"
+            elif dry_run:
+                status = "changed (dry run)"
+            else:
+                os.replace(staged, BASE_DIR / partition_file_name(vocabulary_id))
+                status = "updated"
+            results[config_key] = {"vocabulary_id": vocabulary_id, "diff": diff, "status": status}
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    
+    updated = [config_key for config_key, result in results.items() if result["status"] == "updated"]
+    if updated:
+        build_vocabulary_cache(updated)
+    
+    return results
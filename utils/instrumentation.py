@@ -0,0 +1,120 @@
+import contextvars
+import functools
+import json
+import logging
+import sys
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config import INSTRUMENTATION, INSTRUMENTATION_LOG
+
+# One JSON object per line, so the logs of every session can be aggregated
+logger = logging.getLogger("umc_vocab.timings")
+
+if INSTRUMENTATION and not logger.handlers:
+    if INSTRUMENTATION_LOG:
+        handler = logging.FileHandler(INSTRUMENTATION_LOG, encoding="utf-8")
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+# The script run whose stages are being collected; threads without one (e.g.
+# background prefetch) still log their stages, just not to any run's panel
+_current_run = contextvars.ContextVar("instrumentation_run", default=None)
+
+
+class Run:
+    """Stage timings collected during one run of the app script."""
+
+    def __init__(self, session=None, **fields):
+        self.id = uuid.uuid4().hex[:12]
+        self.session = session
+        self.fields = fields
+        self.timings = []
+        self._start = time.perf_counter()
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+
+def start_run(session=None, **fields):
+    """Begin collecting timings for this thread's script run (None when instrumentation is off)."""
+    if not INSTRUMENTATION:
+        return None
+    run = Run(session, **fields)
+    _current_run.set(run)
+    return run
+
+
+def current_run():
+    return _current_run.get()
+
+
+def emit(record):
+    """Log a stage record as JSON and add it to the current run."""
+    run = _current_run.get()
+    if run is not None:
+        record = {"run": run.id, "session": run.session, **run.fields, **record}
+        run.timings.append(record)
+    logger.info(json.dumps(
+        {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), **record},
+        ensure_ascii=False, default=str
+    ))
+
+
+@contextmanager
+def stage(name, **fields):
+    """Time the enclosed block as stage ``name``.
+    
+    Yields the record being built, so the block can add fields such as
+    the number of rows it produced. Does nothing when instrumentation is off.
+    """
+    record = {"stage": name, **fields}
+    if not INSTRUMENTATION:
+        yield record
+        return
+    
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = round((time.perf_counter() - start) * 1000, 3)
+        emit(record)
+
+
+def row_count(result):
+    """Number of rows in a stage's result: a frame, position array, statistics dict or (frame, ...) tuple."""
+    if isinstance(result, dict):
+        return result.get("total_results")
+    if isinstance(result, tuple):
+        result = result[0]
+    try:
+        return len(result)
+    except TypeError:
+        return None
+
+
+def timed(name):
+    """Decorator recording each call as stage ``name`` with the rows returned.
+    
+    With instrumentation off the function is returned unchanged, so the
+    hot path pays nothing for it.
+    """
+    def decorator(func):
+        if not INSTRUMENTATION:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                result = func(*args, **kwargs)
+                record["rows"] = row_count(result)
+            return result
+        
+        return wrapper
+    
+    return decorator
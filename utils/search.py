@@ -1,40 +1,553 @@
+import re
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-from config import SEARCH_COLUMNS
+from config import (
+    EXACT_MATCH_BOOST, FOLD_COLUMNS, FUZZY_MAX_TERMS, FUZZY_MIN_SIMILARITY, MAX_SUGGESTIONS, NARROW_MAX_ROWS,
+    QUERY_CACHE_MAX_BYTES, QUERY_CACHE_SIZE, QUERY_CACHE_TTL, QUERY_TOKENIZER, SEARCH_COLUMNS, SEARCH_WORKERS
+)
+from utils.instrumentation import timed
+from utils.search_index import TOKEN_RE, fold_series, fold_text, search_text
+from utils.tokenizer import WORD_JOINER, get_tokenizer, segmented_text
 
+# Shared by all sessions for searching several vocabularies at once
+_search_pool = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="vocab-search")
 
-def search_dataframe(df, search_terms):
-    """Search dataframe based on search terms for specific columns."""
-    if not search_terms.strip():
-        return df
+
+def match_mask(df, search_lower, texts=None):
+    """Return a boolean mask of rows matching the lowercased search string.
     
-    search_lower = search_terms.strip().lower()
+    ``texts`` maps column names to precomputed (lowercased or accent-folded)
+    text aligned with ``df``; other columns are lowercased on the fly.
+    """
+    texts = texts or {}
     
     # Create mask for each searchable column
     masks = []
     for col in SEARCH_COLUMNS:
         if col in df.columns:
+            text = texts[col] if col in texts else None
             if col == 'concept_id':
                 # For concept_id, try exact match first, then convert to string for partial match
                 try:
                     # Try exact numeric match
                     masks.append(df[col] == int(search_lower))
+                    continue
                 except ValueError:
-                    # If not numeric, convert column to string and search
-                    masks.append(df[col].astype(str).str.lower().str.contains(search_lower, na=False))
-            else:
-                # For other columns, do case-insensitive partial match
-                masks.append(df[col].astype(str).str.lower().str.contains(search_lower, na=False))
+                    pass
+            
+            # Case-insensitive partial match
+            if text is None:
+                text = search_text(df[col])
+            masks.append(text.str.contains(search_lower, na=False, regex=False))
     
     # Combine all masks with OR operation
     if masks:
         combined_mask = masks[0]
         for mask in masks[1:]:
             combined_mask = combined_mask | mask
-        return df[combined_mask]
+        return combined_mask
     
-    return df
+    return pd.Series(True, index=df.index)
+
+
+def is_number(search_lower):
+    try:
+        int(search_lower)
+        return True
+    except ValueError:
+        return False
+
+
+def exact_matches(index, search_lower):
+    """Return row positions whose concept_id or concept_code equals the query exactly."""
+    if index.lookup is None:
+        return np.array([], dtype=np.int64)
+    
+    hits = index.lookup.find_code(search_lower)
+    try:
+        hits = np.union1d(hits, index.lookup.find_id(int(search_lower)))
+    except ValueError:
+        pass
+    return hits
+
+
+def search_positions(df, search_terms, index=None, fold_accents=False, within=None):
+    """Return the sorted row positions of ``df`` matching the search terms.
+    
+    ``within`` restricts the search to the given sorted row positions, e.g.
+    the matches of a shorter query that the search terms extend; those rows
+    are scanned directly instead of going through the token index.
+    """
+    search_lower = search_terms.strip().lower()
+    if fold_accents:
+        search_lower = fold_text(search_lower)
+    
+    if index is None:
+        subset = df if within is None else df.iloc[within]
+        texts = None
+        if fold_accents:
+            texts = {col: fold_series(search_text(subset[col])) for col in FOLD_COLUMNS if col in subset.columns}
+        mask = match_mask(subset, search_lower, texts).to_numpy()
+        return np.flatnonzero(mask) if within is None else within[mask]
+    
+    texts = index.texts(fold_accents)
+    if within is not None:
+        subset = df.iloc[within]
+        texts_subset = {col: text.iloc[within] for col, text in texts.items()}
+        return within[match_mask(subset, search_lower, texts_subset).to_numpy()]
+    
+    tokens = index.folded_tokens if fold_accents else index.tokens
+    candidates = tokens.candidates(search_lower)
+    if candidates is None:
+        return np.flatnonzero(match_mask(df, search_lower, texts).to_numpy())
+    
+    try:
+        search_id = int(search_lower)
+    except ValueError:
+        search_id = None
+    
+    # A single-token query is contained in every candidate, so there is nothing to verify
+    if search_id is None and TOKEN_RE.fullmatch(search_lower):
+        return candidates
+    
+    # Exact concept_id hits do not go through the token text, e.g. "00123" -> 123
+    if search_id is not None and index.lookup is not None:
+        candidates = np.union1d(candidates, index.lookup.find_id(search_id))
+    
+    subset = df.iloc[candidates]
+    texts_subset = {col: text.iloc[candidates] for col, text in texts.items()}
+    return candidates[match_mask(subset, search_lower, texts_subset).to_numpy()]
+
+
+@lru_cache(maxsize=8)
+def fold_tokenizer(tokenizer):
+    return tokenizer.mapped(fold_text)
+
+
+def folded_tokenizer(name):
+    """Tokenizer ``name`` with an accent-folded dictionary, for segmenting folded queries."""
+    return fold_tokenizer(get_tokenizer(name))
+
+
+def query_words(query, fold_accents=False):
+    """Segment a lowercased (or, with ``fold_accents``, folded) query into words with QUERY_TOKENIZER."""
+    tokenizer = folded_tokenizer(QUERY_TOKENIZER) if fold_accents else get_tokenizer(QUERY_TOKENIZER)
+    return tokenizer.words(query)
+
+
+def whole_word_pattern(words):
+    """Regex matching ``words`` as consecutive words of segmented text.
+    
+    A multi-syllable word at either end may also be part of a longer word
+    there, e.g. "huyết_áp" of "tăng_huyết_áp"; a single syllable must be a
+    word of its own, so "áp" matches neither "áp_xe" nor "huyết_áp".
+    """
+    def boundary(word, edge):
+        return f'(?:{edge}|[ {WORD_JOINER}])' if WORD_JOINER in word else f'(?:{edge}| )'
+    
+    return boundary(words[0], '^') + re.escape(segmented_text(words)) + boundary(words[-1], '$')
+
+
+def word_positions(df, search_terms, index, fold_accents=False):
+    """Return the sorted row positions whose names contain the search terms as whole words.
+    
+    The query is segmented into words the way the names were when the
+    index was built, so "huyết áp" finds "tăng huyết áp" but "đường" does
+    not find "đái tháo đường". Each query word is one lookup in the word index;
+    only the rows holding every word are checked for the words in order.
+    Concepts whose ID or code equals the query are included too.
+    """
+    search_lower = search_terms.strip().lower()
+    exact = exact_matches(index, search_lower)
+    if fold_accents:
+        search_lower = fold_text(search_lower)
+    words = query_words(search_lower, fold_accents)
+    word_index = index.folded_words if fold_accents else index.words
+    
+    candidates = np.array([], dtype=np.int64)
+    for i, word in enumerate(words):
+        rows = word_index.rows_for_terms(word_index.term_ids(word, prefix=True, suffix=True))
+        candidates = rows if i == 0 else np.intersect1d(candidates, rows, assume_unique=True)
+        if len(candidates) == 0:
+            break
+    
+    # A single word is in every row indexed under it, so there is nothing to verify
+    if len(words) <= 1 or len(candidates) == 0:
+        return np.union1d(candidates, exact)
+    
+    pattern = whole_word_pattern(words)
+    mask = np.zeros(len(candidates), dtype=bool)
+    for col, text in index.segmented.items():
+        text = text.iloc[candidates]
+        if fold_accents and col in FOLD_COLUMNS:
+            text = fold_series(text)
+        mask |= text.str.contains(pattern, regex=True, na=False).to_numpy(dtype=bool)
+    return np.union1d(candidates[mask], exact)
 
 
+@timed("search_dataframe")
+def search_dataframe(df, search_terms, index=None, fold_accents=False):
+    """Search dataframe based on search terms for specific columns.
+    
+    When a search index built from ``df`` is given, only the rows the token
+    index returns as candidates are scanned, against its precomputed
+    lowercase text; the result is the same as a full scan. With ``fold_accents`` the names are matched without
+    diacritics, so "tang huyet ap" finds "Tăng huyết áp".
+    """
+    if not search_terms.strip():
+        return df
+    
+    return df.iloc[search_positions(df, search_terms, index, fold_accents)]
+
+
+class IncrementalSearch:
+    """Per-session search that narrows from the previous query's matches.
+    
+    A row containing "hyperten" also contains "hyper", so when a query
+    extends the last one, only the last query's matching rows are searched.
+    """
+
+    def __init__(self):
+        self._frame = None
+        self._query = None
+        self._fold_accents = None
+        self._positions = None
+
+    def reset(self):
+        self._frame = None
+        self._query = None
+        self._positions = None
+
+    def positions(self, df, search_terms, index=None, fold_accents=False):
+        """Same rows as ``search_dataframe``, as positions, reusing the previous matches when possible."""
+        search_lower = search_terms.strip().lower()
+        if not search_lower:
+            self.reset()
+            return np.arange(len(df))
+        
+        # A number also matches concept IDs by equality, so it can neither seed
+        # nor be narrowed from the last query
+        if is_number(search_lower):
+            self.reset()
+            return search_positions(df, search_terms, index, fold_accents)
+        
+        query = fold_text(search_lower) if fold_accents else search_lower
+        within = None
+        if self._frame is not None and self._frame() is df and self._fold_accents == fold_accents:
+            if query == self._query:
+                return self._positions
+            if self._query in query and len(self._positions) <= NARROW_MAX_ROWS:
+                within = self._positions
+        
+        positions = search_positions(df, search_terms, index, fold_accents, within)
+        self._frame = weakref.ref(df)
+        self._query = query
+        self._fold_accents = fold_accents
+        self._positions = positions
+        return positions
+
+    def search(self, df, search_terms, index=None, fold_accents=False):
+        """Same result as ``search_dataframe``, reusing the previous matches when possible."""
+        if not search_terms.strip():
+            self.reset()
+            return df
+        
+        return df.iloc[self.positions(df, search_terms, index, fold_accents)]
+
+
+class QueryCache:
+    """Thread-safe LRU cache of search results, shared by all sessions.
+    
+    Values are int32 row positions, not DataFrame copies, so an entry costs
+    4 bytes per matching row. Entries expire ``ttl`` seconds after they are
+    stored; the least recently used entries are evicted beyond ``maxsize``
+    entries or ``max_bytes`` of positions.
+    """
+
+    def __init__(self, maxsize=QUERY_CACHE_SIZE, ttl=QUERY_CACHE_TTL, max_bytes=QUERY_CACHE_MAX_BYTES):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached positions for ``key``, or None on a miss."""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl:
+                self._remove(key)
+                item = None
+            
+            if item is None:
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def put(self, key, positions):
+        # A result over the whole budget would only evict everything else
+        positions = np.asarray(positions, dtype=np.int32)
+        if self.maxsize <= 0 or positions.nbytes > self.max_bytes:
+            return
+        
+        # Shared between sessions, so make sure nobody can change them in place
+        positions.flags.writeable = False
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic(), positions)
+            self.nbytes += positions.nbytes
+            while len(self._entries) > self.maxsize or self.nbytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key):
+        self.nbytes -= self._entries.pop(key)[1].nbytes
+
+    def invalidate(self, vocabulary=None):
+        """Drop the entries of one vocabulary (the first element of their key), or all entries."""
+        with self._lock:
+            if vocabulary is None:
+                self._entries.clear()
+                self.nbytes = 0
+                return
+            
+            for key in [key for key in self._entries if key[0] == vocabulary]:
+                self._remove(key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / lookups * 100) if lookups else 0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'bytes': self.nbytes,
+                'max_bytes': self.max_bytes
+            }
+
+
+@timed("cached_positions")
+def cached_positions(df, search_terms, index, cache, vocabulary, generation=None,
+                     fold_accents=False, mapped_only=False, searcher=None, whole_words=False):
+    """Contains search through a ``QueryCache``; returns the matching row positions of ``df``.
+    
+    The cache key is the vocabulary and its load ``generation``, the
+    normalized query, and the accent, mapped-only and whole-word settings.
+    On a miss the search runs through ``searcher`` (an ``IncrementalSearch``)
+    when given; with ``whole_words`` it runs ``word_positions`` instead.
+    An empty query matches every row, and is not cached.
+    """
+    search_lower = search_terms.strip().lower()
+    if not search_lower:
+        positions = np.arange(len(df), dtype=np.int32)
+        if mapped_only and 'concept_name_vi' in df.columns:
+            positions = positions[df['concept_name_vi'].notna().to_numpy()]
+        return positions
+    
+    query = fold_text(search_lower) if fold_accents else search_lower
+    key = (vocabulary, generation, query, fold_accents, mapped_only, whole_words)
+    positions = cache.get(key)
+    if positions is None:
+        if whole_words:
+            positions = word_positions(df, search_terms, index, fold_accents)
+        elif searcher is not None:
+            positions = searcher.positions(df, search_terms, index, fold_accents)
+        else:
+            positions = search_positions(df, search_terms, index, fold_accents)
+        
+        if mapped_only and 'concept_name_vi' in df.columns:
+            positions = positions[df['concept_name_vi'].notna().to_numpy()[positions]]
+        positions = positions.astype(np.int32, copy=False)
+        cache.put(key, positions)
+    
+    return positions
+
+
+def cached_search(df, search_terms, index, cache, vocabulary, generation=None,
+                  fold_accents=False, mapped_only=False, searcher=None, whole_words=False):
+    """Same as ``cached_positions``, returning the matching rows of ``df``."""
+    return df.iloc[cached_positions(
+        df, search_terms, index, cache, vocabulary, generation,
+        fold_accents=fold_accents, mapped_only=mapped_only, searcher=searcher, whole_words=whole_words
+    )]
+
+
+def top_k(scores, k):
+    """Return positions of the ``k`` highest positive scores, best first.
+    
+    Uses argpartition, so only the selected ``k`` rows are ever sorted.
+    """
+    candidates = np.flatnonzero(scores > 0)
+    if len(candidates) > k:
+        candidates = candidates[np.argpartition(scores[candidates], -k)[-k:]]
+    
+    # Best score first, file order among ties
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+def rank_scores(df, search_terms, index, fold_accents=False, mapped_only=False):
+    """Return the relevance score of every row of ``df``; rows that don't match score 0.
+    
+    Rows are scored with BM25 over the English and Vietnamese names; an exact
+    concept code or concept ID match is boosted above every text match.
+    Multi-syllable words of the query, such as "tăng huyết áp", are scored
+    again against the word index, so rows holding them as words rank above
+    rows that only share their syllables.
+    """
+    search_lower = search_terms.strip().lower()
+    query = fold_text(search_lower) if fold_accents else search_lower
+    tokens = index.folded_tokens if fold_accents else index.tokens
+    scores = tokens.bm25_scores(query)
+    
+    compounds = [word for word in query_words(query, fold_accents) if WORD_JOINER in word]
+    if compounds:
+        words = index.folded_words if fold_accents else index.words
+        scores += words.bm25_scores(' '.join(compounds))
+    
+    scores[exact_matches(index, search_lower)] += EXACT_MATCH_BOOST
+    
+    if mapped_only and 'concept_name_vi' in df.columns:
+        scores[df['concept_name_vi'].isna().to_numpy()] = 0
+    return scores
+
+
+@timed("rank_dataframe")
+def rank_dataframe(df, search_terms, index, limit=100, fold_accents=False, mapped_only=False):
+    """Return the ``limit`` most relevant rows, best first, with a ``score`` column (see ``rank_scores``)."""
+    if not search_terms.strip():
+        return df
+    
+    scores = rank_scores(df, search_terms, index, fold_accents, mapped_only)
+    positions = top_k(scores, limit)
+    return df.iloc[positions].assign(score=scores[positions])
+
+
+def fuzzy_scores(df, search_terms, index, mapped_only=False):
+    """Return how closely every row of ``df`` matches a possibly misspelled query, from 0 to 1.
+    
+    Query words are matched, accent-insensitively, to the words of the names
+    sharing enough trigrams; the score is the mean similarity of the best
+    match per word. An exact concept code or concept ID match scores 1.
+    """
+    scores = index.trigrams.scores(
+        fold_text(search_terms.strip()),
+        min_similarity=FUZZY_MIN_SIMILARITY,
+        limit=FUZZY_MAX_TERMS
+    )
+    scores[exact_matches(index, search_terms.strip().lower())] = 1
+    
+    if mapped_only and 'concept_name_vi' in df.columns:
+        scores[df['concept_name_vi'].isna().to_numpy()] = 0
+    return scores
+
+
+@timed("fuzzy_dataframe")
+def fuzzy_dataframe(df, search_terms, index, limit=100, mapped_only=False):
+    """Return the ``limit`` rows closest to a possibly misspelled query, with a ``score`` column (see ``fuzzy_scores``)."""
+    if not search_terms.strip():
+        return df
+    
+    scores = fuzzy_scores(df, search_terms, index, mapped_only)
+    positions = top_k(scores, limit)
+    return df.iloc[positions].assign(score=scores[positions])
+
+
+@timed("search_all_vocabularies")
+def search_all_vocabularies(entries, search_terms, cache, mode="contains", limit=1000,
+                            fold_accents=False, mapped_only=False):
+    """Search several loaded vocabularies concurrently and stack the results.
+    
+    ``entries`` maps a source name such as "LOINC" to its store entry. Each
+    vocabulary is searched on its own thread, so the wait is about that of
+    the slowest one. ``mode`` is "contains" or "words" (up to ``limit`` rows
+    from each vocabulary, in file order), "ranked" or "fuzzy" (the ``limit``
+    best rows overall). Returns the results with a leading ``source`` column; the
+    number of matches per vocabulary: every matching row, not just those returned
+    (for "ranked" and "fuzzy", the rows with a positive score); and the statistics
+    of ``get_search_statistics``, over every match for "contains" and "words" and
+    over the returned rows for "ranked" and "fuzzy".
+    """
+    if not search_terms.strip():
+        mode = "contains"
+
+    def run(entry):
+        df, index = entry.frame, entry.index
+        if mode in ("ranked", "fuzzy"):
+            if mode == "ranked":
+                scores = rank_scores(df, search_terms, index, fold_accents, mapped_only)
+            else:
+                scores = fuzzy_scores(df, search_terms, index, mapped_only)
+            positions = top_k(scores, limit)
+            return df.iloc[positions].assign(score=scores[positions]), int(np.count_nonzero(scores > 0)), None
+        
+        positions = cached_positions(
+            df, search_terms, index, cache, entry.config_key, entry.generation,
+            fold_accents=fold_accents, mapped_only=mapped_only, whole_words=mode == "words"
+        )
+        return df.iloc[positions[:limit]], len(positions), match_summary(df, positions)
+    
+    futures = {name: _search_pool.submit(run, entry) for name, entry in entries.items()}
+    
+    frames, counts, summaries = [], {}, []
+    for name, future in futures.items():
+        results, counts[name], summary = future.result()
+        frames.append(results.assign(source=name))
+        summaries.append(summary)
+    
+    # Skip empty frames so their dtypes don't affect the combined columns
+    combined = pd.concat([frame for frame in frames if len(frame)] or frames[:1], ignore_index=True)
+    combined = combined[['source'] + [col for col in combined.columns if col != 'source']]
+    if mode in ("ranked", "fuzzy"):
+        combined = combined.sort_values('score', ascending=False, kind='stable').head(limit)
+        return combined, counts, get_search_statistics(combined, combined)
+    return combined, counts, combine_summaries(summaries)
+
+
+def match_summary(df, positions):
+    """The (matches, mapped matches, domains) of the rows of ``df`` at ``positions``."""
+    mapped_count = 0
+    if 'concept_name_vi' in df.columns:
+        mapped_count = int(df['concept_name_vi'].notna().to_numpy()[positions].sum())
+    domains = set(df['domain_id'].iloc[positions].dropna().unique()) if 'domain_id' in df.columns else set()
+    return len(positions), mapped_count, domains
+
+
+def combine_summaries(summaries):
+    """Statistics like ``get_search_statistics`` over the matches of several vocabularies."""
+    total_results = sum(total for total, _, _ in summaries)
+    mapped_count = sum(mapped for _, mapped, _ in summaries)
+    return {
+        'total_results': total_results,
+        'mapped_count': mapped_count,
+        'coverage': (mapped_count / total_results * 100) if total_results > 0 else 0,
+        'unique_domains': len(set().union(*(domains for _, _, domains in summaries)))
+    }
+
+
+def suggest_completions(df, index, search_terms, limit=MAX_SUGGESTIONS):
+    """Return up to ``limit`` concept names or codes that start with the search terms."""
+    prefix = search_terms.lstrip().lower()
+    if not prefix:
+        return []
+    
+    return [df[col].iat[row] for col, row in index.prefix.suggest(prefix, limit)]
+
+
+@timed("apply_filters")
 def apply_filters(df, show_mapped_only=True):
     """Apply filters to the dataframe."""
     if show_mapped_only and 'concept_name_vi' in df.columns:
@@ -43,6 +556,7 @@ def apply_filters(df, show_mapped_only=True):
     return df
 
 
+@timed("get_search_statistics")
 def get_search_statistics(df, df_filtered):
     """Calculate search and mapping statistics."""
     total_results = len(df_filtered)
@@ -56,3 +570,24 @@ def get_search_statistics(df, df_filtered):
         'coverage': coverage,
         'unique_domains': unique_domains
     }
+
+
+@timed("get_position_statistics")
+def get_position_statistics(df, positions):
+    """Same statistics as ``get_search_statistics`` for the rows of ``df`` at ``positions``.
+    
+    Works on the column arrays, so the result rows never have to be copied out.
+    """
+    total_results = len(positions)
+    mapped_count = 0
+    if 'concept_name_vi' in df.columns:
+        mapped_count = int(df['concept_name_vi'].notna().to_numpy()[positions].sum())
+    coverage = (mapped_count / total_results * 100) if total_results > 0 else 0
+    unique_domains = df['domain_id'].iloc[positions].nunique() if 'domain_id' in df.columns else 0
+    
+    return {
+        'total_results': total_results,
+        'mapped_count': mapped_count,
+        'coverage': coverage,
+        'unique_domains': unique_domains
+    }
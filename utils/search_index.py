@@ -0,0 +1,673 @@
+import unicodedata
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from config import (
+    BM25_B, BM25_K1, COLUMN_TOKENIZERS, FOLD_COLUMNS, RANK_COLUMNS, SEARCH_COLUMNS, SUGGESTION_COLUMNS
+)
+from utils.tokenizer import TOKEN_PATTERN, TOKEN_RE, segment_series
+
+# Shortest query token that ranked search expands to the words it starts
+MIN_PREFIX_LENGTH = 3
+
+# Combining diacritical marks left over after NFD decomposition. Not a raw string:
+# the Arrow regex engine used for string columns does not understand \u escapes.
+COMBINING_MARKS = '[\u0300-\u036f]'
+
+
+def search_text(series):
+    """Return the text a column is searched on: its string form, lowercased.
+    
+    Missing values stay missing, so they never match a query.
+    """
+    return series.astype(pd.StringDtype("pyarrow")).str.lower()
+
+
+def fold_text(text):
+    """Lowercase text and strip Vietnamese diacritics, e.g. "Tăng huyết áp" -> "tang huyet ap"."""
+    decomposed = unicodedata.normalize('NFD', text.lower())
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.replace('đ', 'd')
+
+
+def fold_series(text):
+    """Vectorized fold_text for a Series that is already lowercased with search_text."""
+    return (
+        text.str.normalize('NFD')
+        .str.replace(COMBINING_MARKS, '', regex=True)
+        .str.replace('đ', 'd', regex=False)
+    )
+
+
+class TokenIndex:
+    """Inverted index from tokens to the sorted row positions that contain them.
+    
+    Postings are stored in CSR form: the rows of ``terms[i]`` are
+    ``postings[offsets[i]:offsets[i + 1]]``, and ``freqs`` holds how often the
+    term occurs in each of those rows. Only counted columns (the names) add to
+    ``freqs`` and ``doc_lengths``, which feed BM25 ranking.
+    """
+    
+    def __init__(self, terms, offsets, postings, freqs, doc_lengths):
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.freqs = freqs
+        self.doc_lengths = doc_lengths
+        self.n_rows = len(doc_lengths)
+        self.avg_doc_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index, in bytes."""
+        arrays = self.offsets.nbytes + self.postings.nbytes + self.freqs.nbytes + self.doc_lengths.nbytes
+        return self.terms.memory_usage(deep=True) + arrays
+    
+    @classmethod
+    def from_texts(cls, texts, counted=None):
+        """Build an index from row-aligned text Series (one per searchable column).
+        
+        ``counted`` flags, per text, whether its tokens count towards term
+        frequencies and document lengths; by default all of them do.
+        """
+        counted = counted if counted is not None else [True] * len(texts)
+        
+        pieces = []
+        for text, count in zip(texts, counted):
+            tokens = text.reset_index(drop=True).str.findall(TOKEN_PATTERN).explode().dropna()
+            pieces.append(pd.DataFrame({
+                'row': tokens.index.to_numpy(dtype=np.int64),
+                'term': tokens.to_numpy(),
+                'count': np.full(len(tokens), count, dtype=np.int64)
+            }))
+        
+        return cls._from_pieces(pieces, len(texts[0]) if texts else 0)
+    
+    @classmethod
+    def from_segmented(cls, texts):
+        """Build an index from row-aligned Series of space-separated words, e.g. segmented names.
+        
+        The text is already tokenized, so it is split by Arrow instead of
+        being matched token by token; every word counts towards BM25.
+        """
+        pieces = []
+        for text in texts:
+            words = pc.split_pattern(pa.array(text.array, type=pa.string()), ' ')
+            keep = pc.not_equal(pc.list_flatten(words), '')
+            terms = pc.list_flatten(words).filter(keep)
+            pieces.append(pd.DataFrame({
+                'row': pc.list_parent_indices(words).filter(keep).to_numpy().astype(np.int64),
+                'term': terms.to_numpy(zero_copy_only=False),
+                'count': np.ones(len(terms), dtype=np.int64)
+            }))
+        
+        return cls._from_pieces(pieces, len(texts[0]) if texts else 0)
+    
+    def counted_only(self):
+        """The same index restricted to the counted columns (the names).
+        
+        A term from an uncounted column only has postings with zero frequency,
+        so dropping those leaves exactly the terms and rows of the names.
+        """
+        keep = self.freqs > 0
+        term_ids = np.repeat(np.arange(len(self.terms)), np.diff(self.offsets))
+        counts = np.bincount(term_ids[keep], minlength=len(self.terms))
+        present = counts > 0
+        
+        offsets = np.zeros(int(present.sum()) + 1, dtype=np.int64)
+        np.cumsum(counts[present], out=offsets[1:])
+        return TokenIndex(self.terms[present], offsets, self.postings[keep], self.freqs[keep], self.doc_lengths)
+    
+    @classmethod
+    def _from_pieces(cls, pieces, n_rows):
+        """Build an index from frames of (row, term, count) pairs."""
+        doc_lengths = np.zeros(n_rows, dtype=np.float32)
+        if not pieces or sum(len(p) for p in pieces) == 0:
+            empty = np.array([], dtype=np.int32)
+            return cls(pd.Index([], dtype=object), np.zeros(1, dtype=np.int64), empty, empty.astype(np.uint16), doc_lengths)
+        
+        pairs = pd.concat(pieces, ignore_index=True)
+        codes, terms = pd.factorize(pairs['term'], sort=True)
+        rows = pairs['row'].to_numpy()
+        count = pairs['count'].to_numpy()
+        doc_lengths[:] = np.bincount(rows, weights=count, minlength=n_rows)
+        
+        # One sorted key per (term, row) pair dedupes the postings and orders them
+        keys, inverse = np.unique(codes * max(n_rows, 1) + rows, return_inverse=True)
+        term_of_key, postings = np.divmod(keys, max(n_rows, 1))
+        freqs = np.bincount(inverse, weights=count, minlength=len(keys))
+        
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_of_key, minlength=len(terms)), out=offsets[1:])
+        
+        return cls(
+            pd.Index(terms),
+            offsets,
+            postings.astype(np.int32),
+            np.minimum(freqs, np.iinfo(np.uint16).max).astype(np.uint16),
+            doc_lengths
+        )
+    
+    def term_ids(self, token, prefix=False, suffix=False):
+        """Return ids of indexed terms that equal, start with, end with or contain ``token``.
+        
+        ``prefix`` means the term must start with the token and ``suffix`` that it
+        must end with it; both together require an exact match.
+        """
+        if prefix and suffix:
+            loc = self.terms.get_indexer([token])[0]
+            return np.array([loc] if loc >= 0 else [], dtype=np.int64)
+        if prefix:
+            lo = self.terms.searchsorted(token, side='left')
+            hi = self.terms.searchsorted(token + '\U0010ffff', side='left')
+            return np.arange(lo, hi, dtype=np.int64)
+        if suffix:
+            return np.flatnonzero(self.terms.str.endswith(token))
+        return np.flatnonzero(self.terms.str.contains(token, regex=False))
+
+    def _gather(self, term_ids):
+        """Return posting offsets of all the given terms as one flat array."""
+        starts = self.offsets[term_ids]
+        lengths = self.offsets[term_ids + 1] - starts
+        total = int(lengths.sum())
+        
+        # Expand the [start, end) ranges into one flat array of posting offsets
+        shifts = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths)
+        return shifts + np.arange(total)
+    
+    def rows_for_terms(self, term_ids):
+        """Return the sorted union of the posting lists of the given terms."""
+        rows = self.postings[self._gather(term_ids)]
+        if len(rows) == 0:
+            return np.array([], dtype=np.int64)
+        
+        if len(term_ids) == 1:
+            return rows.astype(np.int64)
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return np.flatnonzero(mask)
+    
+    def bm25_scores(self, query, prefix_weight=0.5):
+        """Return a BM25 score per row for the tokens of ``query``.
+        
+        Tokens match indexed terms exactly. The last token also matches the
+        terms it is a prefix of, weighted by ``prefix_weight``, so a
+        half-typed word still ranks its completions. Tokens shorter than
+        MIN_PREFIX_LENGTH are not expanded, since they are prefixes of too
+        many unrelated words.
+        """
+        scores = np.zeros(self.n_rows, dtype=np.float32)
+        if self.avg_doc_length == 0:
+            return scores
+        
+        tokens = TOKEN_RE.findall(query)
+        for i, token in enumerate(tokens):
+            expand = i == len(tokens) - 1 and len(token) >= MIN_PREFIX_LENGTH
+            ids = self.term_ids(token, prefix=True, suffix=not expand)
+            if len(ids) == 0:
+                continue
+            
+            weights = np.where(self.terms[ids] == token, 1.0, prefix_weight)
+            offsets = self._gather(ids)
+            tf = self.freqs[offsets].astype(np.float32)
+            
+            # Document frequency counts rows where the term occurs in a counted column;
+            # every indexed term has at least one posting, so no segment is empty
+            lengths = self.offsets[ids + 1] - self.offsets[ids]
+            segments = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            doc_freq = np.add.reduceat((tf > 0).astype(np.int64), segments)
+            idf = np.log1p((self.n_rows - doc_freq + 0.5) / (doc_freq + 0.5))
+            
+            rows = self.postings[offsets]
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[rows] / self.avg_doc_length)
+            contrib = np.repeat(idf * weights, lengths) * tf * (BM25_K1 + 1) / (tf + norm)
+            scores += np.bincount(rows, weights=contrib, minlength=self.n_rows).astype(np.float32)
+        
+        return scores
+    
+    def candidates(self, query):
+        """Return sorted row positions whose text may contain ``query`` as a substring.
+        
+        Every row that contains the query is included, so verifying the
+        substring on the candidates gives exactly the result of a full scan.
+        A token bounded by punctuation or spaces inside the query must start
+        or end a token of the row, which prunes more than plain containment.
+        Returns None when the query has no tokens to look up.
+        """
+        result = None
+        for match in TOKEN_RE.finditer(query):
+            ids = self.term_ids(
+                match.group(),
+                prefix=match.start() > 0,
+                suffix=match.end() < len(query)
+            )
+            rows = self.rows_for_terms(ids)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if len(result) == 0:
+                break
+        
+        return result
+
+
+class PrefixIndex:
+    """Sorted order of the lowercased text of several columns, for prefix lookups.
+    
+    Only the sort permutation is stored; keys are read back from the column
+    text, so entry ``i`` of ``order`` is row ``order[i] % n_rows`` of column
+    ``columns[order[i] // n_rows]``.
+    """
+    
+    def __init__(self, columns, texts, order, n_rows):
+        self.columns = columns
+        self.texts = texts
+        self.order = order
+        self.n_rows = n_rows
+        self._arrays = [text.array for text in texts]
+    
+    @classmethod
+    def from_texts(cls, texts):
+        """Build a prefix index from a mapping of column name to lowercased text."""
+        columns = list(texts)
+        series = [texts[col].reset_index(drop=True) for col in columns]
+        n_rows = len(series[0]) if series else 0
+        if not series:
+            return cls(columns, series, np.array([], dtype=np.int64), n_rows)
+        
+        keys = pd.concat(series, ignore_index=True)
+        present = np.flatnonzero(keys.notna().to_numpy())
+        order = present[np.argsort(keys.iloc[present].to_numpy(), kind='stable')]
+        return cls(columns, series, order.astype(np.int64), n_rows)
+    
+    @property
+    def nbytes(self):
+        """Memory held by the sort permutation, in bytes (the text is shared)."""
+        return self.order.nbytes
+    
+    def _key(self, i):
+        col, row = divmod(int(self.order[i]), self.n_rows)
+        return self._arrays[col][row]
+    
+    def _lower_bound(self, key):
+        lo, hi = 0, len(self.order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    def suggest(self, prefix, limit=5, scan=200):
+        """Return up to ``limit`` (column, row) pairs whose text starts with ``prefix``.
+        
+        At most ``scan`` entries of the matching range are read; among them the
+        shortest distinct texts win, so "hyper" offers "hypertension" before
+        longer names that merely start the same way.
+        """
+        lo = self._lower_bound(prefix)
+        hi = min(self._lower_bound(prefix + '\U0010ffff'), lo + scan)
+        
+        best = {}
+        for i in range(lo, hi):
+            key = self._key(i)
+            if key not in best:
+                best[key] = divmod(int(self.order[i]), self.n_rows)
+        
+        keys = sorted(best, key=lambda k: (len(k), k))[:limit]
+        return [(self.columns[best[k][0]], best[k][1]) for k in keys]
+
+
+def trigrams(term):
+    """Return the distinct character trigrams of a term padded with one space each side."""
+    padded = f" {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """Trigram index over the distinct terms of a TokenIndex, for typo-tolerant lookup.
+    
+    Misspelled query tokens are matched to indexed terms that share enough
+    trigrams (Dice similarity), then to rows through the token postings.
+    Built over the names only, so its size follows the words of the names
+    rather than the number of concept IDs and codes.
+    """
+    
+    def __init__(self, tokens, grams, offsets, term_ids, gram_counts):
+        self.tokens = tokens
+        self.grams = grams
+        self.offsets = offsets
+        self.term_ids = term_ids
+        self.gram_counts = gram_counts
+    
+    @classmethod
+    def from_tokens(cls, tokens):
+        """Build the trigram index over the terms of a token index."""
+        term_grams = [trigrams(term) for term in tokens.terms]
+        gram_counts = np.array([len(g) for g in term_grams], dtype=np.int32)
+        
+        owners = np.repeat(np.arange(len(term_grams), dtype=np.int32), gram_counts)
+        flat = [gram for grams in term_grams for gram in grams]
+        codes, grams = pd.factorize(pd.Series(flat, dtype=object), sort=True)
+        
+        order = np.argsort(codes, kind='stable')
+        offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=len(grams)), out=offsets[1:])
+        
+        return cls(tokens, pd.Index(grams), offsets, owners[order], gram_counts)
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index and its token index, in bytes."""
+        arrays = self.offsets.nbytes + self.term_ids.nbytes + self.gram_counts.nbytes
+        return self.grams.memory_usage(deep=True) + arrays + self.tokens.nbytes
+    
+    def similar_terms(self, token, min_similarity, limit):
+        """Return (term ids, similarities) of up to ``limit`` terms similar to ``token``."""
+        query_grams = trigrams(token)
+        locs = self.grams.get_indexer(list(query_grams))
+        locs = locs[locs >= 0]
+        if len(locs) == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        
+        starts, ends = self.offsets[locs], self.offsets[locs + 1]
+        candidates = np.concatenate([self.term_ids[a:b] for a, b in zip(starts, ends)])
+        ids, shared = np.unique(candidates, return_counts=True)
+        
+        similarity = 2 * shared / (len(query_grams) + self.gram_counts[ids])
+        keep = similarity >= min_similarity
+        ids, similarity = ids[keep], similarity[keep]
+        if len(ids) > limit:
+            best = np.argpartition(similarity, -limit)[-limit:]
+            ids, similarity = ids[best], similarity[best]
+        
+        return ids, similarity.astype(np.float32)
+    
+    def scores(self, query, min_similarity=0.45, limit=20):
+        """Return a similarity score in [0, 1] per row for ``query``.
+        
+        Each query token contributes the similarity of the closest term the
+        row contains; the row score is the mean over query tokens.
+        """
+        scores = np.zeros(self.tokens.n_rows, dtype=np.float32)
+        query_tokens = TOKEN_RE.findall(query)
+        
+        for token in query_tokens:
+            ids, similarity = self.similar_terms(token, min_similarity, limit)
+            if len(ids) == 0:
+                continue
+            
+            offsets = self.tokens._gather(ids)
+            rows = self.tokens.postings[offsets]
+            lengths = self.tokens.offsets[ids + 1] - self.tokens.offsets[ids]
+            best = np.zeros(self.tokens.n_rows, dtype=np.float32)
+            np.maximum.at(best, rows, np.repeat(similarity, lengths))
+            scores += best
+        
+        return scores / max(len(query_tokens), 1)
+
+
+class LookupIndex:
+    """Hash indexes from concept_id and (lowercased) concept_code to row positions.
+    
+    Scalar lookups return every matching row; the vectorized ``*_positions``
+    methods map each key to its first row, or -1 when it is missing.
+    """
+    
+    def __init__(self, ids, codes):
+        self.ids = ids
+        self.codes = codes
+        self._first_ids, self._first_id_rows, self._repeated_ids = self._first_occurrences(ids)
+        self._first_codes, self._first_code_rows, self._repeated_codes = self._first_occurrences(codes)
+    
+    @staticmethod
+    def _first_occurrences(index):
+        rows = np.flatnonzero(~index.duplicated(keep='first'))
+        first = index[rows]
+        repeated = index.duplicated(keep=False)[rows]
+        # Build the hash table now rather than on the first query
+        first.get_indexer(first[:1])
+        return first, rows, repeated
+    
+    @classmethod
+    def from_columns(cls, concept_ids, codes_lower):
+        """Build the lookup from the concept_id column and the lowercased concept codes."""
+        return cls(pd.Index(concept_ids.to_numpy()), pd.Index(codes_lower.to_numpy()))
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index, in bytes."""
+        keys = self.ids.memory_usage(deep=True) + self.codes.memory_usage(deep=True)
+        first = self._first_ids.memory_usage(deep=True) + self._first_codes.memory_usage(deep=True)
+        rows = self._first_id_rows.nbytes + self._first_code_rows.nbytes
+        return keys + first + rows + self._repeated_ids.nbytes + self._repeated_codes.nbytes
+    
+    @staticmethod
+    def _find(first, first_rows, repeated, index, key):
+        try:
+            loc = first.get_loc(key)
+        except (KeyError, TypeError):
+            return np.array([], dtype=np.int64)
+        if not repeated[loc]:
+            return first_rows[loc:loc + 1]
+        # The key occurs on several rows, so collect all of them
+        return np.flatnonzero(index == key)
+    
+    def find_id(self, concept_id):
+        """Return the row positions with this concept_id."""
+        return self._find(self._first_ids, self._first_id_rows, self._repeated_ids, self.ids, concept_id)
+    
+    def find_code(self, code):
+        """Return the row positions with this concept code (case-insensitive)."""
+        return self._find(
+            self._first_codes, self._first_code_rows, self._repeated_codes, self.codes, str(code).strip().lower()
+        )
+    
+    def id_positions(self, concept_ids):
+        """Map each concept_id to its first row position, -1 if absent."""
+        locs = self._first_ids.get_indexer(pd.Index(concept_ids))
+        return np.where(locs >= 0, self._first_id_rows[locs], -1)
+    
+    def code_positions(self, codes):
+        """Map each concept code (case-insensitive) to its first row position, -1 if absent."""
+        keys = pd.Series(codes, dtype=object).astype(str).str.strip().str.lower()
+        locs = self._first_codes.get_indexer(pd.Index(keys))
+        return np.where(locs >= 0, self._first_code_rows[locs], -1)
+
+
+class SearchIndex:
+    """Precomputed search structures for one vocabulary frame.
+    
+    ``lower`` holds the lowercased text of the searchable columns and ``tokens``
+    indexes it. For accent-insensitive search, the folded text of the name
+    columns is kept in ``folded`` and indexed in ``folded_tokens``. All text
+    Series are aligned with the frame. ``segmented`` holds the name columns
+    split into words by their tokenizer (see utils/tokenizer.py), and
+    ``words`` and ``folded_words`` index those words and the dictionary words
+    nested in them, for whole-word search. ``prefix`` serves type-ahead
+    suggestions and ``trigrams`` fuzzy matching over the folded terms of
+    the names.
+    ``lookup`` resolves exact concept IDs and codes.
+    """
+    
+    def __init__(self, lower, tokens, folded, folded_tokens, segmented, words, folded_words,
+                 prefix, trigrams, lookup):
+        self.lower = lower
+        self.tokens = tokens
+        self.folded = folded
+        self.folded_tokens = folded_tokens
+        self.segmented = segmented
+        self.words = words
+        self.folded_words = folded_words
+        self.prefix = prefix
+        self.trigrams = trigrams
+        self.lookup = lookup
+    
+    @property
+    def nbytes(self):
+        """Approximate memory held by the index, in bytes."""
+        texts = sum(
+            text.memory_usage(deep=True)
+            for text in [*self.lower.values(), *self.folded.values(), *self.segmented.values()]
+        )
+        indexes = sum(
+            index.nbytes
+            for index in [self.tokens, self.folded_tokens, self.words, self.folded_words, self.prefix, self.trigrams]
+        )
+        return texts + indexes + (self.lookup.nbytes if self.lookup is not None else 0)
+    
+    def texts(self, fold_accents=False):
+        """Return the per-column text to match queries against."""
+        return {**self.lower, **self.folded} if fold_accents else self.lower
+
+
+def build_search_index(df):
+    """Build the search index over the searchable columns of a vocabulary frame."""
+    columns = [col for col in SEARCH_COLUMNS if col in df.columns]
+    texts = {col: search_text(df[col]) for col in columns}
+    folded = {col: fold_series(texts[col]) for col in FOLD_COLUMNS if col in texts}
+    
+    counted = [col in RANK_COLUMNS for col in columns]
+    folded_tokens = TokenIndex.from_texts([folded.get(col, texts[col]) for col in columns], counted)
+    
+    # Names are segmented once here; the index terms add the words nested in longer ones
+    segmented, terms = {}, {}
+    for col in RANK_COLUMNS:
+        if col in texts:
+            segmented[col], terms[col] = segment_series(texts[col], COLUMN_TOKENIZERS.get(col, "syllable"))
+    words = TokenIndex.from_segmented(list(terms.values()))
+    folded_words = TokenIndex.from_segmented([
+        fold_series(text) if col in FOLD_COLUMNS else text for col, text in terms.items()
+    ])
+    
+    lookup = None
+    if 'concept_id' in df.columns and 'concept_code' in texts:
+        lookup = LookupIndex.from_columns(df['concept_id'], texts['concept_code'])
+    
+    return SearchIndex(
+        lower=texts,
+        tokens=TokenIndex.from_texts(list(texts.values()), counted),
+        folded=folded,
+        folded_tokens=folded_tokens,
+        segmented=segmented,
+        words=words,
+        folded_words=folded_words,
+        prefix=PrefixIndex.from_texts({col: texts[col] for col in SUGGESTION_COLUMNS if col in texts}),
+        trigrams=TrigramIndex.from_tokens(folded_tokens.counted_only()),
+        lookup=lookup
+    )
+
+
+# Arrays of a SearchIndex saved as .npy files by save_search_index, by attribute path
+INDEX_ARRAYS = [
+    "tokens.offsets", "tokens.postings", "tokens.freqs", "tokens.doc_lengths",
+    "folded_tokens.offsets", "folded_tokens.postings", "folded_tokens.freqs", "folded_tokens.doc_lengths",
+    "words.offsets", "words.postings", "words.freqs", "words.doc_lengths",
+    "folded_words.offsets", "folded_words.postings", "folded_words.freqs", "folded_words.doc_lengths",
+    "trigrams.tokens.offsets", "trigrams.tokens.postings", "trigrams.tokens.freqs", "trigrams.tokens.doc_lengths",
+    "prefix.order", "trigrams.offsets", "trigrams.term_ids", "trigrams.gram_counts"
+]
+
+# Sorted term lists, saved as single-column Arrow files
+INDEX_TERMS = [
+    "tokens.terms", "folded_tokens.terms", "words.terms", "folded_words.terms", "trigrams.tokens.terms",
+    "trigrams.grams"
+]
+
+
+def _attribute(index, path):
+    obj = index
+    for name in path.split('.'):
+        obj = getattr(obj, name)
+    return obj
+
+
+def write_arrow(path, table):
+    """Write a Table as an uncompressed Arrow IPC file, which can be memory-mapped as-is."""
+    with pa.OSFile(str(path), 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def read_arrow(path):
+    """Memory-map an Arrow IPC file as a Table; its buffers stay in the OS page cache, shared by every process."""
+    with pa.memory_map(str(path), 'r') as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+def arrow_to_frame(table):
+    """Convert a Table to a DataFrame without copying numeric or string columns out of its buffers."""
+    return table.to_pandas(
+        types_mapper={pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}.get,
+        split_blocks=True
+    )
+
+
+def save_search_index(index, directory):
+    """Save a search index to ``directory`` for ``open_search_index``.
+    
+    Numeric arrays go to .npy files and text to Arrow IPC files, both of
+    which are memory-mapped when opened. Hash lookups are not saved.
+    """
+    for name in INDEX_ARRAYS:
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(_attribute(index, name)))
+    for name in INDEX_TERMS:
+        terms = pa.array(_attribute(index, name).to_numpy(dtype=object), type=pa.string())
+        write_arrow(directory / f"{name}.arrow", pa.table({"term": terms}))
+    
+    texts = {f"lower/{col}": pa.array(text.array) for col, text in index.lower.items()}
+    texts.update({f"folded/{col}": pa.array(text.array) for col, text in index.folded.items()})
+    texts.update({f"segmented/{col}": pa.array(text.array) for col, text in index.segmented.items()})
+    write_arrow(directory / "texts.arrow", pa.table(texts))
+
+
+def open_search_index(directory, df):
+    """Open a search index saved by ``save_search_index`` for the frame ``df``.
+    
+    The postings and text stay memory-mapped, so processes opening the
+    same files share one copy in the page cache. Only the term lists and
+    the concept ID/code hash lookups are materialized per process.
+    """
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in INDEX_ARRAYS}
+    terms = {
+        name: pd.Index(read_arrow(directory / f"{name}.arrow").column("term").to_pylist(), dtype=object)
+        for name in INDEX_TERMS
+    }
+    
+    texts = arrow_to_frame(read_arrow(directory / "texts.arrow"))
+    texts.index = df.index
+    kinds = {"lower": {}, "folded": {}, "segmented": {}}
+    for name in texts.columns:
+        kind, col = name.split('/', 1)
+        kinds[kind][col] = texts[name].rename(col)
+    lower = kinds["lower"]
+    
+    def token_index(prefix):
+        return TokenIndex(
+            terms[f"{prefix}.terms"], arrays[f"{prefix}.offsets"], arrays[f"{prefix}.postings"],
+            arrays[f"{prefix}.freqs"], arrays[f"{prefix}.doc_lengths"]
+        )
+    
+    suggestion_texts = {col: lower[col] for col in SUGGESTION_COLUMNS if col in lower}
+    
+    lookup = None
+    if 'concept_id' in df.columns and 'concept_code' in lower:
+        lookup = LookupIndex.from_columns(df['concept_id'], lower['concept_code'])
+    
+    return SearchIndex(
+        lower=lower,
+        tokens=token_index("tokens"),
+        folded=kinds["folded"],
+        folded_tokens=token_index("folded_tokens"),
+        segmented=kinds["segmented"],
+        words=token_index("words"),
+        folded_words=token_index("folded_words"),
+        prefix=PrefixIndex(
+            list(suggestion_texts), [text.reset_index(drop=True) for text in suggestion_texts.values()],
+            arrays["prefix.order"], len(df)
+        ),
+        trigrams=TrigramIndex(
+            token_index("trigrams.tokens"), terms["trigrams.grams"], arrays["trigrams.offsets"],
+            arrays["trigrams.term_ids"], arrays["trigrams.gram_counts"]
+        ),
+        lookup=lookup
+    )
@@ -0,0 +1,187 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import streamlit as st
+from config import DATA_FILES, PREFETCH_WORKERS, REFRESH_CHECK_SECONDS
+from utils.data_loader import load_indexed_vocabulary, resolve_vocabulary, source_signature
+from utils.search import QueryCache
+
+# Frames in the store are shared by every session. Copy-on-write (always on from
+# pandas 3) makes slices zero-copy views and turns any write into a private copy.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Numbers each loaded entry, so results cached for an older load are never reused
+_generations = itertools.count(1)
+
+
+class VocabularyEntry:
+    """One loaded vocabulary: its merged frame and search index."""
+
+    def __init__(self, config_key, frame, index, signature=None):
+        self.config_key = config_key
+        self.frame = frame
+        self.index = index
+        # Source files the entry was loaded from, to tell when a newer release is on disk
+        self.signature = signature
+        self.generation = next(_generations)
+        # Column arrays for reading single cells without going through the frame
+        self.columns = {col: frame[col].array for col in frame.columns}
+        # The entry is immutable, so its size only needs computing once
+        self.nbytes = int(frame.memory_usage(deep=True).sum()) + index.nbytes
+
+
+class VocabularyStore:
+    """Process-wide, read-only registry of loaded vocabularies.
+    
+    Each vocabulary is loaded and indexed once, then handed to every
+    session as-is instead of being copied per cache hit. Search results
+    are cached in ``query_cache`` under each entry's config key and generation.
+    Vocabularies nobody has asked for yet can be warmed up in background
+    threads with ``prefetch``. When a vocabulary's source files change
+    (e.g. after apply_release.py), ``refresh`` loads the new version while
+    the old entry keeps serving, then swaps it in.
+    """
+
+    def __init__(self, prefetch_workers=PREFETCH_WORKERS):
+        self.query_cache = QueryCache()
+        self._entries = {}
+        self._locks = {}
+        self._loading = set()
+        self._refreshing = set()
+        self._last_check = time.monotonic()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="vocab-prefetch")
+
+    def _key_lock(self, config_key):
+        with self._lock:
+            return self._locks.setdefault(config_key, threading.Lock())
+
+    def get(self, vocab_type):
+        """Return the entry for a vocabulary, loading it on first use (None if unknown)."""
+        config_key = resolve_vocabulary(vocab_type)
+        if config_key is None:
+            return None
+        
+        entry = self._entries.get(config_key)
+        if entry is not None:
+            return entry
+        
+        # One lock per vocabulary so concurrent sessions (and prefetch) don't load it twice
+        with self._key_lock(config_key):
+            entry = self._entries.get(config_key)
+            if entry is None:
+                with self._lock:
+                    self._loading.add(config_key)
+                try:
+                    entry = self._load(config_key)
+                finally:
+                    with self._lock:
+                        self._loading.discard(config_key)
+        
+        return entry
+
+    def _load(self, config_key):
+        """Load and index a vocabulary, then publish it; failed loads are not kept, so the next request retries."""
+        signature = source_signature(config_key)
+        frame, index = load_indexed_vocabulary(config_key, signature)
+        entry = VocabularyEntry(config_key, frame, index, signature)
+        if not frame.empty:
+            # Replacing the dict item is atomic: readers get either the old entry or the new one
+            self._entries[config_key] = entry
+            self.query_cache.invalidate(config_key)
+        return entry
+
+    def refresh(self, vocab_type):
+        """Reload a vocabulary from its current source files and swap it in.
+        
+        Sessions keep using the old entry until the new one is ready, and
+        the new entry's generation keeps cached results of the old one
+        from being served. Returns the new entry (None if unknown).
+        """
+        config_key = resolve_vocabulary(vocab_type)
+        if config_key is None:
+            return None
+        
+        with self._key_lock(config_key):
+            with self._lock:
+                self._refreshing.add(config_key)
+            try:
+                return self._load(config_key)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(config_key)
+
+    def stale(self):
+        """Return the config keys of loaded vocabularies whose source files have changed since they were loaded."""
+        return [
+            config_key for config_key, entry in list(self._entries.items())
+            if entry.signature is not None and entry.signature != source_signature(config_key)
+        ]
+
+    def check_for_updates(self, min_interval=REFRESH_CHECK_SECONDS):
+        """Refresh changed vocabularies in the background, checking at most every ``min_interval`` seconds.
+        
+        Cheap enough to call on every request: between checks it only
+        compares timestamps. Returns the config keys being refreshed.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_check < min_interval:
+                return []
+            self._last_check = now
+        
+        started = []
+        for config_key in self.stale():
+            with self._lock:
+                if config_key in self._refreshing:
+                    continue
+                self._refreshing.add(config_key)
+            self._executor.submit(self.refresh, config_key)
+            started.append(config_key)
+        return started
+
+    def prefetch(self, vocab_types=None):
+        """Start loading vocabularies (all by default) in the background and return at once."""
+        for vocab_type in (vocab_types or DATA_FILES):
+            config_key = resolve_vocabulary(vocab_type)
+            with self._lock:
+                if config_key is None or config_key in self._entries or config_key in self._loading:
+                    continue
+                # Marked now so another session can't queue the same load
+                self._loading.add(config_key)
+            self._executor.submit(self._prefetch, config_key)
+
+    def _prefetch(self, config_key):
+        try:
+            self.get(config_key)
+        finally:
+            with self._lock:
+                self._loading.discard(config_key)
+
+    def status(self, vocab_type):
+        """Return "loaded", "updating", "loading" or "not loaded" for a vocabulary."""
+        config_key = resolve_vocabulary(vocab_type)
+        if config_key in self._refreshing:
+            return "updating"
+        if config_key in self._entries:
+            return "loaded"
+        if config_key in self._loading:
+            return "loading"
+        return "not loaded"
+
+    def loaded(self):
+        """Return the config keys of the vocabularies currently held."""
+        return list(self._entries)
+
+    def resident_size(self):
+        """Return the memory held by all loaded frames and indexes, in bytes."""
+        return sum(entry.nbytes for entry in self._entries.values())
+
+
+@st.cache_resource(show_spinner=False)
+def get_vocabulary_store():
+    """Return the vocabulary store shared by all sessions of this server process."""
+    return VocabularyStore()
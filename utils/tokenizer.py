@@ -0,0 +1,158 @@
+import re
+from functools import lru_cache
+import pandas as pd
+from config import VIETNAMESE_DICTIONARY
+
+# A token is a maximal run of word characters; punctuation and spaces separate tokens
+TOKEN_PATTERN = r'\w+'
+TOKEN_RE = re.compile(TOKEN_PATTERN)
+
+# Joins the syllables of a multi-syllable word, e.g. "tăng_huyết_áp", so that a
+# word is still a single token
+WORD_JOINER = '_'
+
+
+def segmented_text(words):
+    """Space-separated words of a text, as kept in the index for whole-word matching."""
+    return ' '.join(words)
+
+
+class SyllableTokenizer:
+    """Splits text into syllables, the tokens of the token index; right for English names."""
+
+    def words(self, text):
+        return TOKEN_RE.findall(text)
+
+    def segment(self, text):
+        """Segment a lowercased text Series; returns its (words, index terms) Series."""
+        words = text.str.findall(TOKEN_PATTERN).str.join(' ').astype(text.dtype)
+        return words, words
+
+    def mapped(self, func):
+        return self
+
+
+class MaximumMatchingTokenizer:
+    """Segments text into dictionary words by forward maximum matching.
+    
+    At each syllable the longest dictionary word starting there is taken;
+    a syllable that starts no dictionary word is a word on its own. The
+    syllables of a word are joined with WORD_JOINER, so "bệnh tăng huyết áp"
+    becomes ["bệnh", "tăng_huyết_áp"]. No model is involved: segmentation
+    only depends on the word list.
+    """
+
+    def __init__(self, dictionary):
+        self.dictionary = frozenset(
+            ' '.join(syllables) for syllables in (TOKEN_RE.findall(word.lower()) for word in dictionary)
+            if len(syllables) > 1
+        )
+        self.max_syllables = max((word.count(' ') + 1 for word in self.dictionary), default=1)
+        self._first_syllables = frozenset(word.split(' ', 1)[0] for word in self.dictionary)
+
+    def _spans(self, syllables):
+        """Yield the (start, end) syllable range of each word."""
+        i = 0
+        while i < len(syllables):
+            end = i + 1
+            if syllables[i] in self._first_syllables:
+                for size in range(min(self.max_syllables, len(syllables) - i), 1, -1):
+                    if ' '.join(syllables[i:i + size]) in self.dictionary:
+                        end = i + size
+                        break
+            yield i, end
+            i = end
+
+    def words(self, text):
+        syllables = TOKEN_RE.findall(text)
+        return [WORD_JOINER.join(syllables[start:end]) for start, end in self._spans(syllables)]
+
+    def words_and_terms(self, text):
+        """Words of ``text``, and those plus the dictionary words nested in them.
+        
+        The second list is what a row is indexed under, e.g. "tăng_huyết_áp"
+        and "huyết_áp", so a query for a shorter word still finds the longer
+        words it is part of.
+        """
+        syllables = TOKEN_RE.findall(text)
+        words, terms = [], []
+        for start, end in self._spans(syllables):
+            words.append(WORD_JOINER.join(syllables[start:end]))
+            terms.append(words[-1])
+            for i in range(start, end - 1):
+                for j in range(i + 2, min(end, i + self.max_syllables) + 1):
+                    if (i, j) != (start, end) and ' '.join(syllables[i:j]) in self.dictionary:
+                        terms.append(WORD_JOINER.join(syllables[i:j]))
+        return words, terms
+
+    def segment(self, text):
+        """Segment a lowercased text Series; returns its (words, index terms) Series.
+        
+        Each distinct text is segmented once; missing values stay missing.
+        """
+        words, terms = {}, {}
+        for value in text.dropna().unique():
+            value_words, value_terms = self.words_and_terms(value)
+            words[value] = segmented_text(value_words)
+            terms[value] = segmented_text(value_terms)
+        return text.map(words).astype(text.dtype), text.map(terms).astype(text.dtype)
+
+    def mapped(self, func):
+        """The same tokenizer over a transformed dictionary, e.g. accent-folded for folded queries."""
+        return MaximumMatchingTokenizer(func(word) for word in self.dictionary)
+
+
+def load_dictionary(path):
+    """Read a word list: one word per line, ignoring blank lines and # comments."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    except OSError:
+        return []
+
+
+# Tokenizers by the names used in COLUMN_TOKENIZERS and QUERY_TOKENIZER; each
+# is built from the word list in TOKENIZER_DICTIONARIES, if it has one
+TOKENIZERS = {
+    "syllable": SyllableTokenizer,
+    "vietnamese": MaximumMatchingTokenizer
+}
+TOKENIZER_DICTIONARIES = {"vietnamese": VIETNAMESE_DICTIONARY}
+
+
+def dictionary_signature(path):
+    """Describe a word list by path, size and modification time, or None without one."""
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+        return str(path), stat.st_size, stat.st_mtime_ns
+    except OSError:
+        return str(path), None, None
+
+
+@lru_cache(maxsize=8)
+def build_tokenizer(name, signature):
+    """Build tokenizer ``name`` from the word list described by ``signature``."""
+    if signature is None:
+        return TOKENIZERS[name]()
+    return TOKENIZERS[name](load_dictionary(signature[0]))
+
+
+def get_tokenizer(name):
+    """Return the shared tokenizer registered as ``name`` in TOKENIZERS.
+    
+    Tokenizers are cached by the signature of their word list, so editing
+    the list gives a rebuilt tokenizer, as it gives a rebuilt vocabulary.
+    """
+    if name not in TOKENIZERS:
+        raise ValueError(f"unknown tokenizer {name!r}, expected one of {', '.join(TOKENIZERS)}")
+    return build_tokenizer(name, dictionary_signature(TOKENIZER_DICTIONARIES.get(name)))
+
+
+def segment_series(text, name):
+    """Segment a lowercased text Series with tokenizer ``name``; returns its (words, index terms) Series."""
+    if text.empty:
+        empty = pd.Series([], dtype=text.dtype, index=text.index)
+        return empty, empty
+    return get_tokenizer(name).segment(text)
@@ -1,4 +1,6 @@
 import streamlit as st
+from config import EXPORT_FORMATS
+from utils.export import export_file, export_file_name
 
 
 def render_custom_css():
@@ -76,15 +78,124 @@ def render_search_box():
     """, unsafe_allow_html=True)
 
 
+def render_suggestions(suggestions, search_key):
+    """Render type-ahead suggestions as buttons that fill in the search box."""
+    if not suggestions:
+        return
+
+    def select(text):
+        st.session_state[search_key] = text
+    
+    cols = st.columns(len(suggestions))
+    for i, (col, text) in enumerate(zip(cols, suggestions)):
+        with col:
+            st.button(
+                f"↳ {text}",
+                key=f"{search_key}_suggestion_{i}",
+                on_click=select,
+                args=(text,),
+                width="stretch"
+            )
+
+
+def render_download_button(df, file_stem, label="⬇️ Download Results", help=None, key="download",
+                           encoding='utf-8', positions=None):
+    """Render a format picker and a download button that builds the file only when clicked.
+    
+    With ``positions``, only the rows of ``df`` at those positions are exported.
+    """
+    export_format = st.selectbox(
+        "Format",
+        list(EXPORT_FORMATS),
+        key=f"{key}_format",
+        label_visibility="collapsed"
+    )
+    st.download_button(
+        label,
+        data=lambda: export_file(df, export_format, encoding=encoding, positions=positions),
+        file_name=export_file_name(file_stem, export_format),
+        mime=EXPORT_FORMATS[export_format]["mime"],
+        help=help,
+        key=key
+    )
+
+
+def render_pagination(df, rows_per_page, key, positions=None, signature=None):
+    """Render page controls and return only the rows on the current page.
+    
+    ``positions`` are the result's row positions in ``df`` (every row if
+    None); only the visible page is taken out of ``df``, so flipping pages
+    never touches the rest of the result. The page goes back to 1 whenever
+    ``signature`` (e.g. the query and filters) or the page size changes.
+    """
+    total = len(df) if positions is None else len(positions)
+    pages = max(1, -(-total // rows_per_page))
+    page_key = f"{key}_page"
+    signature_key = f"{key}_signature"
+    
+    if st.session_state.get(signature_key) != (signature, rows_per_page):
+        st.session_state[signature_key] = (signature, rows_per_page)
+        st.session_state[page_key] = 1
+    st.session_state[page_key] = min(max(int(st.session_state.get(page_key, 1)), 1), pages)
+    page = st.session_state[page_key]
+
+    def step(delta):
+        st.session_state[page_key] = min(max(st.session_state[page_key] + delta, 1), pages)
+    
+    col1, col2, col3, col4 = st.columns([1, 1, 1, 3])
+    
+    with col1:
+        st.button("◀ Previous", key=f"{key}_previous", on_click=step, args=(-1,),
+                  disabled=page <= 1, width="stretch")
+    
+    with col2:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key, label_visibility="collapsed")
+    
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", on_click=step, args=(1,),
+                  disabled=page >= pages, width="stretch")
+    
+    start = (page - 1) * rows_per_page
+    end = min(start + rows_per_page, total)
+    
+    with col4:
+        st.caption(f"Rows {start + 1:,}–{end:,} of {total:,} · page {page:,} of {pages:,}")
+    
+    if positions is None:
+        return df.iloc[start:end]
+    return df.iloc[positions[start:end]]
+
+
+def render_vocabulary_status(statuses):
+    """Render whether each vocabulary is loaded, being updated, loading in the background, or not loaded yet."""
+    icons = {"loaded": "✅", "updating": "🔄", "loading": "⏳", "not loaded": "⚪"}
+    st.caption(" · ".join(f"{icons[status]} {name}" for name, status in statuses.items()))
+
+
+def render_timing_panel(run):
+    """Render the stage timings of the current script run (instrumentation only)."""
+    with st.expander("⏱️ Timings", expanded=False):
+        if not run.timings:
+            st.caption("No timed stages in this run")
+            return
+        st.dataframe(
+            [{"stage": t["stage"], "ms": t["ms"], "rows": t.get("rows")} for t in run.timings],
+            width="stretch",
+            hide_index=True
+        )
+        st.caption(f"Run `{run.id}`: {run.elapsed_ms():,.0f} ms so far")
+
+
 def render_sidebar_info():
     """Render informational content in sidebar."""
     st.markdown("""
     <div class="sidebar-info">
         <h4>💡 Search Tips:</h4>
         <ul>
-            <li>Use concept ID for exact matches</li>
+            <li>Use a concept ID or exact code to jump straight to a concept</li>
             <li>Enter keywords for partial matches</li>
             <li>Search works in both English and Vietnamese</li>
+            <li>Tick "Ignore accents" to type Vietnamese without diacritics</li>
             <li>Use filters to refine results</li>
         </ul>
     </div>
@@ -110,7 +221,7 @@ def render_no_results():
         <h3>🔍 No Results Found</h3>
         <p>Try adjusting your search terms or filters</p>
         <ul style="text-align: left; display: inline-block;">
-            <li>Check spelling of search terms</li>
+            <li>Check spelling of search terms, or switch to "Fuzzy" matching</li>
             <li>Try broader keywords</li>
             <li>Remove the "Mapped only" filter</li>
             <li>Use partial matches instead of exact terms</li>
@@ -132,6 +243,9 @@ def render_footer():
 def configure_dataframe_display():
     """Configure dataframe column display settings."""
     return {
+        "source": st.column_config.TextColumn("Source", width="small"),
+        "input_code": st.column_config.TextColumn("Input", width="small"),
+        "matched": st.column_config.CheckboxColumn("Found", width="small"),
         "concept_id": st.column_config.NumberColumn("Concept ID", width="small"),
         "concept_name": st.column_config.TextColumn("English Name", width="large"),
         "concept_name_vi": st.column_config.TextColumn("Vietnamese Name", width="large"),
@@ -139,5 +253,6 @@ def configure_dataframe_display():
         "vocabulary_id": st.column_config.TextColumn("Vocabulary", width="small"),
         "concept_class_id": st.column_config.TextColumn("Class", width="small"),
         "standard_concept": st.column_config.TextColumn("Standard", width="small"),
-        "concept_code": st.column_config.TextColumn("Code", width="medium")
+        "concept_code": st.column_config.TextColumn("Code", width="medium"),
+        "score": st.column_config.NumberColumn("Relevance", format="%.2f", width="small")
     }